@@ -0,0 +1,302 @@
+"""
+Benchmarks of the engine, written as JSON to track regressions between
+releases:
+
+    python benchmark.py --output results.json
+    python benchmark.py --bodies 100 1000 --backends direct barnes_hut
+
+Every case runs a fixed number of steps of one system with one force backend
+and one integrator, and records the steps and force evaluations per second
+together with the relative energy drift over the run. `drift_cost`, the drift
+times the number of force evaluations, compares the accuracy per unit cost of
+the integrators on a given system, lower is better.
+`pair_interactions_per_second` is only reported for the backends summing all
+the n (n - 1) pairs, not for Barnes-Hut.
+
+The Kepler integrators are not run by default: `kepler` never calls the force
+backend and `kepler_split` only suits a body orbiting a dominant one, so when
+asked for with `--integrators` they only run on the scenarios, not on the
+disks.
+
+`block_hermite`, the `BlockTimestepper` of the scenarios, sums the forces
+directly without softening, so it only runs on the scenarios, with the
+direct backend. Its force evaluations are its block steps, each one computing
+the forces of the bodies due at that block time, and its pair interactions
+those of these bodies.
+
+The systems are the JSON scenarios and synthetic disks (see `sim_disk.py`) of
+10 to 100k bodies. The disks run with the softening length `sim_disk.EPS` in
+the forces and in the energy, their drift is that of the softened system.
+"""
+from typing import Any, Dict, List, Optional
+from datetime import datetime, timezone
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from nbody import DirectSum, SystemState, direct_accelerations, make_update
+from nbody.diagnostics import kinetic_energy, potential_energy
+from nbody.integrators import INTEGRATORS, get_integrator
+from nbody.scenario import list_scenarios, load_scenario
+
+BODIES = [10, 100, 1000, 10_000, 100_000]
+BACKENDS = ["direct", "barnes_hut", "parallel"]
+PAIR_BACKENDS = ["direct", "parallel"]  # Backends evaluating all the pairs.
+KEPLER_INTEGRATORS = ["kepler", "kepler_split"]  # Only run on the scenarios.
+BLOCK_INTEGRATOR = "block_hermite"  # `BlockTimestepper`, only run on the scenarios.
+INTEGRATOR_NAMES = [
+    name for name in INTEGRATORS if name not in KEPLER_INTEGRATORS
+] + [BLOCK_INTEGRATOR]
+THETA = 0.7  # Opening angle of the Barnes-Hut backend.
+
+DIRECT_MAX_BODIES = 10_000  # Larger systems only run with Barnes-Hut.
+DRIFT_MAX_BODIES = 10_000  # The energy is not measured above, it is O(N^2).
+SCENARIO_STEPS = 1000  # Steps of the scenario runs.
+PAIR_BUDGET = 10_000_000  # Pair interactions of a synthetic run, sets its steps.
+
+
+class CountingAccelerations:
+    """Force backend counting the calls to the backend it wraps."""
+
+    def __init__(self, accelerations):
+        self.accelerations = accelerations
+        self.calls = 0
+
+    def __call__(self, pos: np.ndarray, mass: np.ndarray) -> np.ndarray:
+        self.calls += 1
+        return self.accelerations(pos, mass)
+
+
+def make_backend(name: str, eps: float = 0.0):
+    if name == "direct":
+        return DirectSum(eps) if eps else direct_accelerations
+    if name == "barnes_hut":
+        from nbody.barnes_hut import BarnesHut
+
+        return BarnesHut(THETA, eps=eps)
+    if name == "parallel":
+        from nbody.parallel import ParallelAccelerations
+
+        return ParallelAccelerations(eps=eps)
+    raise ValueError(
+        f"unknown backend '{name}', expected one of {', '.join(BACKENDS)}"
+    )
+
+
+def energy(state: SystemState, eps: float = 0.0) -> float:
+    return (
+        kinetic_energy(state.vel, state.mass) +
+        potential_energy(state.pos, state.mass, eps)
+    )
+
+
+def run_case(
+    state: SystemState,
+    dt: float,
+    steps: int,
+    backend: str,
+    integrator: str,
+    eps: float = 0.0,
+) -> Dict[str, Any]:
+    """Time `steps` steps of `state` after one warm-up step, with the
+    softening length `eps`."""
+    n = len(state)
+    if integrator == BLOCK_INTEGRATOR:
+        return run_block_case(state, dt, steps, eps)
+    accelerations = make_backend(backend, eps)
+    try:
+        counter = CountingAccelerations(accelerations)
+        update = make_update(counter, get_integrator(integrator))
+        update(state, dt)  # warm-up, e.g. the process pool of the parallel backend
+        counter.calls = 0
+
+        start = time.perf_counter()
+        final = state
+        for _ in range(steps):
+            final = update(final, dt)
+        elapsed = time.perf_counter() - start
+    finally:
+        if hasattr(accelerations, "close"):
+            accelerations.close()
+
+    return case_result(
+        state, final, dt, steps, backend, integrator, eps, elapsed, counter.calls,
+        counter.calls * n * (n - 1) if backend in PAIR_BACKENDS else None,
+    )
+
+
+def run_block_case(
+    state: SystemState,
+    dt: float,
+    steps: int,
+    eps: float = 0.0,
+) -> Dict[str, Any]:
+    """`run_case` for `BlockTimestepper`, with the direct forces it computes
+    itself."""
+    from nbody.block_timestep import BlockTimestepper
+
+    if eps:
+        raise ValueError(f"{BLOCK_INTEGRATOR} has no softening, got eps={eps}")
+    update = BlockTimestepper()
+    update(state, dt)  # warm-up, the next call starts again from `state`
+    update.evaluations = update.block_steps = 0
+
+    start = time.perf_counter()
+    final = state
+    for _ in range(steps):
+        final = update(final, dt)
+    elapsed = time.perf_counter() - start
+
+    return case_result(
+        state, final, dt, steps, "direct", BLOCK_INTEGRATOR, eps, elapsed,
+        update.block_steps, update.evaluations * (len(state) - 1),
+    )
+
+
+def case_result(
+    state: SystemState,
+    final: SystemState,
+    dt: float,
+    steps: int,
+    backend: str,
+    integrator: str,
+    eps: float,
+    elapsed: float,
+    evaluations: int,
+    pairs: Optional[int],
+) -> Dict[str, Any]:
+    """Results of a case that took `elapsed` seconds and `evaluations` force
+    evaluations for `pairs` pair interactions, None when they are not all
+    summed."""
+    n = len(state)
+
+    drift = None
+    if n <= DRIFT_MAX_BODIES:
+        initial_energy = energy(state, eps)
+        drift = abs((energy(final, eps) - initial_energy) / initial_energy)
+    return {
+        "bodies": n,
+        "backend": backend,
+        "integrator": integrator,
+        "steps": steps,
+        "dt": dt,
+        "seconds": elapsed,
+        "steps_per_second": steps / elapsed,
+        "force_evaluations": evaluations,
+        "force_evaluations_per_second": evaluations / elapsed,
+        "pair_interactions_per_second": None if pairs is None else pairs / elapsed,
+        "energy_drift": drift,
+        "drift_cost": None if drift is None or not evaluations else drift * evaluations,
+    }
+
+
+def synthetic_steps(n: int) -> int:
+    return int(min(SCENARIO_STEPS, max(1, PAIR_BUDGET // (n * n))))
+
+
+def metadata() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def benchmark(
+    scenarios: List[str],
+    bodies: List[int],
+    backends: List[str],
+    integrators: List[str],
+    steps: Optional[int] = None,
+    log=sys.stderr,
+) -> Dict[str, Any]:
+    """Run every case and return the results with a description of the
+    machine."""
+    from sim_disk import DT as DISK_DT, EPS as DISK_EPS, disk
+
+    cases = []
+    for name in scenarios:
+        scenario = load_scenario(name)
+        for integrator in integrators:
+            cases.append((
+                f"scenario:{name}", scenario.initial_state, scenario.dt,
+                steps or SCENARIO_STEPS, "direct", integrator, 0.0,
+            ))
+    for n in bodies:
+        for backend in backends:
+            if backend != "barnes_hut" and n > DIRECT_MAX_BODIES:
+                continue
+            for integrator in integrators:
+                if integrator in KEPLER_INTEGRATORS + [BLOCK_INTEGRATOR]:
+                    continue
+                cases.append((
+                    "disk", lambda n=n: disk(n - 1), DISK_DT,
+                    steps or synthetic_steps(n), backend, integrator, DISK_EPS,
+                ))
+
+    results = []
+    for system, build, dt, case_steps, backend, integrator, eps in cases:
+        result = {"system": system}
+        result.update(run_case(build(), dt, case_steps, backend, integrator, eps))
+        results.append(result)
+        drift = result["energy_drift"]
+        log.write(
+            f"{system:<24} {result['bodies']:>7} {backend:<11} {integrator:<16}"
+            f"{result['steps_per_second']:>12.1f} steps/s  "
+            f"drift {'-' if drift is None else f'{drift:.3g}'}\n"
+        )
+        log.flush()
+    return {"meta": metadata(), "results": results}
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark the engine.")
+    parser.add_argument("--output",
+                        help="JSON file receiving the results, stdout by default")
+    parser.add_argument("--scenarios", nargs="*", default=None,
+                        help="JSON scenarios, all of them by default")
+    parser.add_argument("--bodies", nargs="*", type=int, default=BODIES,
+                        help="sizes of the synthetic systems")
+    parser.add_argument("--backends", nargs="*", default=BACKENDS, choices=BACKENDS)
+    parser.add_argument("--integrators", nargs="*", default=INTEGRATOR_NAMES,
+                        choices=list(INTEGRATORS) + [BLOCK_INTEGRATOR],
+                        help="integrators, all but the Kepler ones by default")
+    parser.add_argument("--steps", type=int,
+                        help="steps of every case, by default 1000 for the "
+                             "scenarios and fewer for large synthetic systems")
+    args = parser.parse_args(argv)
+
+    results = benchmark(
+        list_scenarios() if args.scenarios is None else args.scenarios,
+        args.bodies,
+        args.backends,
+        args.integrators,
+        args.steps,
+    )
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    else:
+        json.dump(results, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+    main()
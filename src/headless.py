@@ -0,0 +1,268 @@
+"""
+Run a scenario without pygame, e.g. on a compute node:
+
+    python headless.py sim_binary --steps 100000 --output binary.csv --every 100
+
+Long runs can write checkpoints with `--checkpoint`, continue later with
+`--resume` or start new runs from a checkpoint with `--fork`, see
+`nbody.checkpoint`.
+
+A scenario is either a JSON file of the `scenarios` directory, given by its
+name or path, or any module with an `initial_state()` function, an
+`update(state, dt)` function and a `DT` time step, like the `sim_*.py` scripts,
+and optionally the `EPS` softening length of its forces, used by the energy
+diagnostics.
+"""
+from typing import Any, Callable, Dict, List, Optional, TextIO, Tuple
+from types import ModuleType
+import argparse
+import csv
+import importlib
+import os
+import sys
+import time
+
+from nbody.checkpoint import CheckpointWriter, load_checkpoint
+from nbody.diagnostics import Diagnostics
+from nbody.scenario import load_scenario, scenario_path
+from nbody.trajectory import TrajectoryWriter
+
+State = Any
+Update = Callable[[State, float], State]
+Sink = Callable[[int, float, State], None]
+
+
+def load_module(name: str) -> ModuleType:
+    """Import a scenario module from its name, with or without the `sim_`
+    prefix and `.py` suffix, e.g. `binary` for `sim_binary.py`."""
+    name = name[:-3] if name.endswith(".py") else name
+    try:
+        return importlib.import_module(name)
+    except ModuleNotFoundError as e:
+        if e.name != name or name.startswith("sim_"):
+            raise
+        return importlib.import_module("sim_" + name)
+
+
+def resolve(name: str) -> Tuple[Callable[[], State], Update, float, float]:
+    """Initial state builder, update function, time step and softening length
+    of a scenario, from a JSON scenario first and from a module otherwise."""
+    if name.endswith(".json") or os.path.exists(scenario_path(name)):
+        scenario = load_scenario(name)
+        return scenario.initial_state, scenario.make_update(), scenario.dt, 0.0
+    module = load_module(name)
+    return module.initial_state, module.update, module.DT, getattr(module, "EPS", 0.0)
+
+
+class CsvSink:
+    """Write the position and velocity of every body to a CSV file, every
+    `every` steps."""
+
+    header = ["step", "time", "body", "x", "y", "z", "vx", "vy", "vz"]
+
+    def __init__(self, path: str, every: int = 1):
+        self.every = every
+        self._file = open(path, "w", newline="")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(self.header)
+
+    def __call__(self, step: int, t: float, state: State):
+        if step % self.every:
+            return
+        for i, b in enumerate(state):
+            self._writer.writerow([
+                step, t, i,
+                b.pos.x, b.pos.y, b.pos.z,
+                b.vel.x, b.vel.y, b.vel.z,
+            ])
+
+    def close(self):
+        self._file.close()
+
+
+def open_sink(path: str, dt: float, every: int = 1) -> Sink:
+    """Build the output sink matching the extension of `path`."""
+    if path.endswith(".csv"):
+        return CsvSink(path, every)
+    if path.endswith(".traj"):
+        return TrajectoryWriter(path, dt, every)
+    raise ValueError(
+        f"unsupported output format: '{path}', expected a .csv or .traj file"
+    )
+
+
+def fan_out(sinks: List[Optional[Sink]]) -> Optional[Sink]:
+    """Sink calling every sink of `sinks` that is not None."""
+    sinks = [s for s in sinks if s is not None]
+    if len(sinks) <= 1:
+        return sinks[0] if sinks else None
+
+    def sink(step: int, t: float, state: State):
+        for s in sinks:
+            s(step, t, state)
+
+    return sink
+
+
+def run(
+    state: State,
+    update: Update,
+    dt: float,
+    steps: int,
+    progress: float = 0.0,
+    sink: Optional[Sink] = None,
+    log: TextIO = sys.stderr,
+    start_step: int = 0,
+    start_time: float = 0.0,
+) -> Tuple[State, Dict[str, float]]:
+    """Call `update` `steps` times.
+
+    Args:
+        state: the initial state.
+        update: the update function of the scenario.
+        dt: the time step.
+        steps: the number of steps.
+        progress: interval in seconds between two progress lines written to
+            `log`, 0 to disable them.
+        sink: optional callable receiving `(step, time, state)` for the
+            initial state and after every step.
+        start_step: step of the initial state, when resuming a run.
+        start_time: time of the initial state, when resuming a run.
+
+    Returns:
+        the final state and statistics about the run.
+    """
+    # times are `step * dt`, exactly like an uninterrupted run when resuming
+    # with the same time step
+    offset = start_time - start_step * dt
+    if sink is not None:
+        sink(start_step, start_time, state)
+
+    start = last_report = time.perf_counter()
+    for step in range(start_step + 1, start_step + steps + 1):
+        state = update(state, dt)
+        if sink is not None:
+            sink(step, step * dt + offset, state)
+
+        if progress > 0:
+            now = time.perf_counter()
+            if now - last_report >= progress:
+                last_report = now
+                done = step - start_step
+                log.write(
+                    f"step {done}/{steps}  t={step * dt + offset:.6g} s  "
+                    f"{done / (now - start):.1f} steps/s\n"
+                )
+                log.flush()
+
+    elapsed = time.perf_counter() - start
+    return state, {
+        "steps": steps,
+        "simulated_time": steps * dt,
+        "elapsed": elapsed,
+        "steps_per_second": steps / elapsed if elapsed > 0 else float("inf"),
+    }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        description="Run a scenario without opening a window."
+    )
+    parser.add_argument("scenario", nargs="?",
+                        help="scenario file or module, e.g. solar_system or "
+                             "sim_disk, the one of the checkpoint by default")
+    duration = parser.add_mutually_exclusive_group(required=True)
+    duration.add_argument("--steps", type=int, help="number of steps")
+    duration.add_argument("--time", type=float, help="simulated time in seconds")
+    parser.add_argument("--dt", type=float,
+                        help="time step, the one of the scenario by default")
+    parser.add_argument("--progress", type=float, default=1.0,
+                        help="seconds between progress lines, 0 to disable")
+    parser.add_argument("--output", help="file receiving the states (.csv or .traj)")
+    parser.add_argument("--every", type=int, default=1,
+                        help="write one state every EVERY steps")
+    parser.add_argument("--diagnostics", type=int, default=0, metavar="K",
+                        help="sample energy and momenta every K steps, 0 to disable")
+    parser.add_argument("--checkpoint", metavar="PATH",
+                        help="checkpoint file, may contain {step} to keep them all, "
+                             "the resumed one by default with --resume")
+    parser.add_argument("--checkpoint-every", type=int, default=0, metavar="N",
+                        help="write a checkpoint every N steps, by default only at "
+                             "the end of the run")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--resume", metavar="PATH",
+                        help="continue the run saved in a checkpoint")
+    source.add_argument("--fork", metavar="PATH",
+                        help="start a new run from a checkpoint, possibly with "
+                             "another scenario or time step")
+    args = parser.parse_args(argv)
+
+    checkpoint = None
+    if args.resume or args.fork:
+        checkpoint = load_checkpoint(args.resume or args.fork)
+    name = args.scenario or (checkpoint.scenario if checkpoint else None)
+    if name is None:
+        parser.error("a scenario is required without --resume or --fork")
+    if args.resume and (
+        checkpoint.scenario not in (None, name) or
+        args.dt not in (None, checkpoint.dt)
+    ):
+        parser.error("--resume continues the run as it was, use --fork to change "
+                     "its scenario or time step")
+
+    initial_state, update, dt, eps = resolve(name)
+    if checkpoint is not None:
+        dt = checkpoint.dt
+    dt = args.dt if args.dt is not None else dt
+    steps = args.steps if args.steps is not None else int(round(args.time / dt))
+
+    if checkpoint is None:
+        state, start_step, start_time = initial_state(), 0, 0.0
+    else:
+        state, start_step, start_time = (
+            checkpoint.state, checkpoint.step, checkpoint.time
+        )
+        if checkpoint.scenario in (None, name) and hasattr(update, "restore"):
+            update.restore(checkpoint.update_state, state)
+
+    diagnostics = Diagnostics(every=args.diagnostics, eps=eps)
+    if checkpoint is not None:
+        # a resumed run measures the drifts from the start of the original run,
+        # a fork from its own start
+        diagnostics.restore(
+            checkpoint.diagnostics if args.resume else {}, start_step, start_time
+        )
+    sampled_update = diagnostics.wrap(update)
+
+    checkpoint_path = args.checkpoint or args.resume
+    sinks = [
+        open_sink(args.output, dt, args.every) if args.output else None,
+        CheckpointWriter(
+            checkpoint_path, dt, args.checkpoint_every,
+            scenario=name, update=update, start=start_step,
+            diagnostics=diagnostics if diagnostics.enabled else None,
+        ) if checkpoint_path else None,
+    ]
+    try:
+        _, stats = run(
+            state, sampled_update, dt, steps,
+            progress=args.progress, sink=fan_out(sinks),
+            start_step=start_step, start_time=start_time,
+        )
+    finally:
+        for sink in sinks:
+            if sink is not None:
+                sink.close()
+
+    print(
+        f"{stats['steps']} steps, {stats['simulated_time']:.6g} s simulated "
+        f"in {stats['elapsed']:.3f} s: {stats['steps_per_second']:.1f} steps/s"
+    )
+    if hasattr(update, "report"):
+        print(update.report())
+    if diagnostics.enabled:
+        print(diagnostics.report())
+
+
+if __name__ == "__main__":
+    main()
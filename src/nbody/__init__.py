@@ -0,0 +1,60 @@
+"""
+N-body engine: array based state, force backends, integrators, diagnostics,
+trajectory files, checkpoints, collisions, ensembles and JSON scenarios.
+
+The core (`SystemState`, `direct_accelerations`, `step`, `update`,
+`make_update`) is imported with the package, everything else only when first
+used, so that e.g. a headless run never pays for the process pool of the
+parallel backend.
+"""
+from importlib import import_module
+
+from .core import (
+    BLOCK_SIZE,
+    G,
+    Accelerations,
+    BodyView,
+    DirectSum,
+    Integrator,
+    SystemState,
+    direct_accelerations,
+    make_update,
+    step,
+    update,
+)
+
+# Public names of the submodules, imported on first access.
+_LAZY = {
+    "BarnesHut": "barnes_hut",
+    "force_error": "barnes_hut",
+    "BlockTimestepper": "block_timestep",
+    "Checkpoint": "checkpoint",
+    "CheckpointWriter": "checkpoint",
+    "load_checkpoint": "checkpoint",
+    "save_checkpoint": "checkpoint",
+    "Collisions": "collisions",
+    "merge_collisions": "collisions",
+    "Diagnostics": "diagnostics",
+    "Ensemble": "ensemble",
+    "INTEGRATORS": "integrators",
+    "get_integrator": "integrators",
+    "kepler_drift": "kepler",
+    "ParallelAccelerations": "parallel",
+    "Scenario": "scenario",
+    "list_scenarios": "scenario",
+    "load_scenario": "scenario",
+    "Trajectory": "trajectory",
+    "TrajectoryWriter": "trajectory",
+}
+
+
+def __getattr__(name: str):
+    if name not in _LAZY:
+        raise AttributeError(f"module 'nbody' has no attribute '{name}'")
+    value = getattr(import_module(f".{_LAZY[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
@@ -0,0 +1,354 @@
+from typing import Dict, Optional
+from dataclasses import dataclass
+
+import numpy as np
+
+from .core import G, direct_accelerations
+
+THETA = 0.5  # Default opening angle.
+LEAF_SIZE = 8  # Maximum number of bodies in a leaf of the tree.
+MAX_DEPTH = 21  # Number of levels of the tree, 3 * 21 bits fit in a Morton key.
+CHUNK_SIZE = 4096  # Number of targets walking the tree at the same time.
+
+
+def _spread_bits(x: np.ndarray) -> np.ndarray:
+    """Insert two zero bits between each of the 21 low bits of `x`."""
+    x = x.astype(np.uint64) & np.uint64(0x1FFFFF)
+    x = (x | x << np.uint64(32)) & np.uint64(0x1F00000000FFFF)
+    x = (x | x << np.uint64(16)) & np.uint64(0x1F0000FF0000FF)
+    x = (x | x << np.uint64(8)) & np.uint64(0x100F00F00F00F00F)
+    x = (x | x << np.uint64(4)) & np.uint64(0x10C30C30C30C30C3)
+    x = (x | x << np.uint64(2)) & np.uint64(0x1249249249249249)
+    return x
+
+
+def morton_keys(pos: np.ndarray, lo: np.ndarray, size: float) -> np.ndarray:
+    """Compute the Morton keys of positions inside the cube of corner `lo` and
+    side `size`, with `MAX_DEPTH` bits per axis."""
+    cells = np.floor((pos - lo) / size * 2 ** MAX_DEPTH)
+    cells = np.clip(cells, 0, 2 ** MAX_DEPTH - 1).astype(np.uint64)
+    return (
+        _spread_bits(cells[:, 0]) << np.uint64(2) |
+        _spread_bits(cells[:, 1]) << np.uint64(1) |
+        _spread_bits(cells[:, 2])
+    )
+
+
+def _ranges(start: np.ndarray, count: np.ndarray) -> np.ndarray:
+    """Concatenate `arange(s, s + c)` for every pair of `start` and `count`."""
+    offsets = np.repeat(start - np.cumsum(count) + count, count)
+    return offsets + np.arange(count.sum())
+
+
+@dataclass
+class Octree:
+    """Linear octree built along the Morton curve.
+
+    The bodies of a node are `order[start:end]`, `keys` are the sorted Morton
+    keys of the bodies and `prefix` the key prefix shared by the bodies of a
+    node at its `level`. The children of a node are the nodes `child_start`
+    to `child_start + child_count`, leaves have no child. The root is the
+    cube of corner `lo` and side `size[0]`.
+    """
+    order: np.ndarray
+    keys: np.ndarray
+    body_mass: np.ndarray
+    start: np.ndarray
+    end: np.ndarray
+    level: np.ndarray
+    prefix: np.ndarray
+    child_start: np.ndarray
+    child_count: np.ndarray
+    size: np.ndarray
+    mass: np.ndarray
+    com: np.ndarray
+    lo: np.ndarray
+
+
+def build_octree(
+    pos: np.ndarray,
+    mass: np.ndarray,
+    leaf_size: int = LEAF_SIZE,
+) -> Octree:
+    """Build the octree of a set of bodies, level by level.
+
+    Every level costs O(N) array operations, hence O(N log N) overall.
+    """
+    lo = pos.min(axis=0)
+    size = float((pos.max(axis=0) - lo).max())
+    size = size * (1 + 1e-9) if size > 0 else 1.0
+
+    keys = morton_keys(pos, lo, size)
+    order = np.argsort(keys, kind="stable")
+    keys = keys[order]
+
+    starts = [np.array([0])]
+    ends = [np.array([len(mass)])]
+    levels = [np.array([0])]
+    prefixes = [np.array([0], dtype=np.uint64)]
+    parents, first_children, n_children = [], [], []
+
+    n_nodes = 1
+    frontier = np.array([0])
+    frontier_start, frontier_end = starts[0], ends[0]
+    for level in range(MAX_DEPTH):
+        split = (frontier_end - frontier_start) > leaf_size
+        if not split.any():
+            break
+        s = frontier_start[split]
+        c = frontier_end[split] - s
+
+        # a child starts wherever the key prefix of the next level changes
+        members = _ranges(s, c)
+        owner = np.repeat(np.arange(len(s)), c)
+        prefix = keys[members] >> np.uint64(3 * (MAX_DEPTH - level - 1))
+        first = np.ones(len(members), dtype=bool)
+        first[1:] = (prefix[1:] != prefix[:-1]) | (owner[1:] != owner[:-1])
+        first = np.flatnonzero(first)
+        last = np.append(first[1:], len(members)) - 1
+
+        counts = np.bincount(owner[first], minlength=len(s))
+        parents.append(frontier[split])
+        first_children.append(n_nodes + np.cumsum(counts) - counts)
+        n_children.append(counts)
+
+        frontier_start = members[first]
+        frontier_end = members[last] + 1
+        frontier = n_nodes + np.arange(len(first))
+        n_nodes += len(first)
+
+        starts.append(frontier_start)
+        ends.append(frontier_end)
+        levels.append(np.full(len(first), level + 1))
+        prefixes.append(prefix[first])
+
+    child_start = np.zeros(n_nodes, dtype=int)
+    child_count = np.zeros(n_nodes, dtype=int)
+    if parents:
+        child_start[np.concatenate(parents)] = np.concatenate(first_children)
+        child_count[np.concatenate(parents)] = np.concatenate(n_children)
+
+    start = np.concatenate(starts)
+    end = np.concatenate(ends)
+
+    # exact per node sums, the even segments of reduceat are [start, end)
+    bounds = np.stack([start, end], axis=1).ravel()
+    padded_mass = np.append(mass[order], 0.0)
+    padded_moment = np.vstack([pos[order] * mass[order, None], np.zeros(3)])
+    node_mass = np.add.reduceat(padded_mass, bounds)[::2]
+    node_moment = np.add.reduceat(padded_moment, bounds, axis=0)[::2]
+
+    level = np.concatenate(levels)
+    return Octree(
+        order=order,
+        keys=keys,
+        body_mass=mass,
+        start=start,
+        end=end,
+        level=level,
+        prefix=np.concatenate(prefixes),
+        child_start=child_start,
+        child_count=child_count,
+        size=size / 2.0 ** level,
+        mass=node_mass,
+        com=node_moment / node_mass[:, None],
+        lo=lo,
+    )
+
+
+def _accumulate(acc: np.ndarray, targets: np.ndarray, values: np.ndarray):
+    for k in range(3):
+        acc[:, k] += np.bincount(targets, weights=values[:, k],
+                                 minlength=len(acc))
+
+
+def tree_accelerations(
+    tree: Octree,
+    pos: np.ndarray,
+    theta: float = THETA,
+    targets: Optional[np.ndarray] = None,
+    points: Optional[np.ndarray] = None,
+    eps: float = 0.0,
+) -> np.ndarray:
+    """Compute the accelerations of `targets` by walking the tree.
+
+    A node is approximated by its centre of mass when `size / distance <
+    theta` and the target is outside of it, leaves that must be opened are
+    summed directly.
+
+    Args:
+        tree: the octree of the bodies.
+        pos: (N, 3) array of positions used to build the tree.
+        theta: the opening angle, 0 gives back the direct sum.
+        targets: optional indices of the bodies whose acceleration is wanted,
+            all the bodies by default.
+        points: optional (M, 3) positions of bodies that are not in the tree,
+            e.g. test particles, whose accelerations are wanted instead.
+        eps: Plummer softening length of the forces of the bodies and of
+            the nodes, see `direct_accelerations`.
+
+    Returns:
+        (len(targets), 3) array of accelerations, or (M, 3) with `points`.
+    """
+    if points is None:
+        target_pos = pos
+        target_keys = np.empty(len(pos), dtype=np.uint64)
+        target_keys[tree.order] = tree.keys
+        if targets is None:
+            targets = np.arange(len(pos))
+    else:
+        target_pos = points
+        target_keys = morton_keys(points, tree.lo, tree.size[0])
+        targets = np.arange(len(points))
+
+    acc = np.zeros((len(targets), 3))
+    for chunk_start in range(0, len(targets), CHUNK_SIZE):
+        chunk = targets[chunk_start:chunk_start + CHUNK_SIZE]
+        chunk_acc = np.zeros((len(chunk), 3))
+
+        # pairs of (local target, node) still to be visited
+        local = np.arange(len(chunk))
+        nodes = np.zeros(len(chunk), dtype=int)
+        while len(local):
+            body = chunk[local]
+            r = tree.com[nodes] - target_pos[body]
+            d2 = np.einsum("ij,ij->i", r, r)
+            shift = (3 * (MAX_DEPTH - tree.level[nodes])).astype(np.uint64)
+            inside = (target_keys[body] >> shift) == tree.prefix[nodes]
+            far = (tree.size[nodes] ** 2 < theta ** 2 * d2) & ~inside
+
+            if far.any():
+                d2_far = d2[far] + eps ** 2
+                magnitude = G * tree.mass[nodes[far]] / (d2_far * np.sqrt(d2_far))
+                _accumulate(chunk_acc, local[far], r[far] * magnitude[:, None])
+
+            leaf = ~far & (tree.child_count[nodes] == 0)
+            if leaf.any():
+                leaf_local = local[leaf]
+                leaf_nodes = nodes[leaf]
+                counts = tree.end[leaf_nodes] - tree.start[leaf_nodes]
+                pair_local = np.repeat(leaf_local, counts)
+                sources = tree.order[_ranges(tree.start[leaf_nodes], counts)]
+                if points is None:
+                    not_self = sources != chunk[pair_local]
+                    pair_local, sources = pair_local[not_self], sources[not_self]
+
+                r_leaf = pos[sources] - target_pos[chunk[pair_local]]
+                d2_leaf = np.einsum("ij,ij->i", r_leaf, r_leaf)
+                if eps:
+                    d2_leaf += eps ** 2
+                if not d2_leaf.all():
+                    raise ValueError("Distance cannot be zero")
+                magnitude = G * tree.body_mass[sources] / \
+                    (d2_leaf * np.sqrt(d2_leaf))
+                _accumulate(chunk_acc, pair_local, r_leaf * magnitude[:, None])
+
+            opened = ~far & ~leaf
+            counts = tree.child_count[nodes[opened]]
+            local = np.repeat(local[opened], counts)
+            nodes = _ranges(tree.child_start[nodes[opened]], counts)
+
+        acc[chunk_start:chunk_start + len(chunk)] = chunk_acc
+    return acc
+
+
+def barnes_hut_accelerations(
+    pos: np.ndarray,
+    mass: np.ndarray,
+    theta: float = THETA,
+    leaf_size: int = LEAF_SIZE,
+    targets: Optional[np.ndarray] = None,
+    eps: float = 0.0,
+) -> np.ndarray:
+    """Build the tree and compute the accelerations of `targets`, all the
+    bodies by default, with the softening length `eps`. Massless test
+    particles are left out of the tree and only walk it, so they cost
+    O(log N_massive) each."""
+    if targets is None:
+        targets = np.arange(len(mass))
+    massive = mass != 0
+    if massive.all():
+        tree = build_octree(pos, mass, leaf_size)
+        return tree_accelerations(tree, pos, theta, targets, eps=eps)
+
+    acc = np.zeros((len(targets), 3))
+    sources = np.flatnonzero(massive)
+    if not len(sources):
+        return acc
+    tree = build_octree(pos[sources], mass[sources], leaf_size)
+    heavy = massive[targets]
+    column = np.cumsum(massive) - 1  # index of every massive body in the tree
+    acc[heavy] = tree_accelerations(
+        tree, pos[sources], theta, column[targets[heavy]], eps=eps
+    )
+    acc[~heavy] = tree_accelerations(
+        tree, pos[sources], theta, points=pos[targets[~heavy]], eps=eps
+    )
+    return acc
+
+
+def force_error(
+    pos: np.ndarray,
+    mass: np.ndarray,
+    theta: float = THETA,
+    sample: int = 1000,
+    seed: int = 0,
+    leaf_size: int = LEAF_SIZE,
+    eps: float = 0.0,
+) -> Dict[str, float]:
+    """Compare the tree accelerations to the direct sum with the same
+    softening length `eps` on a random sample of bodies.
+
+    Returns:
+        the median, 99th percentile and maximum of the relative error
+        `|a_tree - a_direct| / |a_direct|` on the sample.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(mass)
+    targets = np.sort(rng.choice(n, size=min(sample, n), replace=False))
+
+    approximate = barnes_hut_accelerations(pos, mass, theta, leaf_size, targets, eps)
+    exact = direct_accelerations(pos, mass, targets, eps=eps)
+
+    error = np.linalg.norm(approximate - exact, axis=1) / \
+        np.linalg.norm(exact, axis=1)
+    return {
+        "theta": theta,
+        "sample": len(targets),
+        "median": float(np.median(error)),
+        "p99": float(np.percentile(error, 99)),
+        "max": float(error.max()),
+    }
+
+
+class BarnesHut:
+    """Barnes-Hut force backend, to be given to `nbody.make_update`.
+
+    The tree is rebuilt from scratch at every call, which costs O(N log N) like
+    the walk itself. When `error_sample` is positive, every call also measures
+    the error against the direct sum on that many bodies and stores it in
+    `last_error`. `eps` is the Plummer softening length of the forces.
+    """
+
+    def __init__(
+        self,
+        theta: float = THETA,
+        leaf_size: int = LEAF_SIZE,
+        error_sample: int = 0,
+        eps: float = 0.0,
+    ):
+        self.theta = theta
+        self.leaf_size = leaf_size
+        self.error_sample = error_sample
+        self.eps = eps
+        self.last_error: Optional[Dict[str, float]] = None
+
+    def __call__(self, pos: np.ndarray, mass: np.ndarray) -> np.ndarray:
+        if self.error_sample > 0:
+            self.last_error = force_error(
+                pos, mass, self.theta, self.error_sample,
+                leaf_size=self.leaf_size, eps=self.eps,
+            )
+        return barnes_hut_accelerations(
+            pos, mass, self.theta, self.leaf_size, eps=self.eps
+        )
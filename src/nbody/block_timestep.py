@@ -0,0 +1,243 @@
+"""
+Hermite integrator with hierarchical block time steps, for systems where a
+few bodies need much smaller steps than the others, e.g. during close
+encounters:
+
+    stepper = BlockTimestepper(eta=0.02)
+    simulation.loop(initial_state=state, update=stepper)
+    stepper.report()  # force evaluations saved vs. a fixed step run
+
+It computes its own forces and jerks by direct summation, so it is an update
+callback rather than an integrator of `integrators`. A scenario selects it with
+`"integrator": "block_hermite"`.
+"""
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from .core import BLOCK_SIZE, G, SystemState
+
+ETA = 0.02  # Accuracy parameter of the time step criterion.
+MAX_LEVEL = 20  # Smallest step is dt / 2**MAX_LEVEL.
+
+
+def accelerations_and_jerks(
+    pos: np.ndarray,
+    vel: np.ndarray,
+    mass: np.ndarray,
+    targets: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Compute the accelerations and their time derivatives (jerks) of the
+    `targets` by direct summation over the massive bodies, massless test
+    particles attracting nothing.
+
+    Returns:
+        two (len(targets), 3) arrays, the accelerations and the jerks.
+    """
+    acc = np.empty((len(targets), 3))
+    jerk = np.empty((len(targets), 3))
+    if not mass.all():
+        sources = np.flatnonzero(mass)
+        column = np.cumsum(mass != 0) - 1  # index of every massive body in sources
+        column[mass == 0] = -1
+        pos_sources, vel_sources, mass = pos[sources], vel[sources], mass[sources]
+    else:
+        column = np.arange(len(mass))
+        pos_sources, vel_sources = pos, vel
+    for start in range(0, len(targets), BLOCK_SIZE):
+        rows = targets[start:start + BLOCK_SIZE]
+        r = pos_sources[None, :, :] - pos[rows, None, :]
+        v = vel_sources[None, :, :] - vel[rows, None, :]
+        d2 = np.einsum("ijk,ijk->ij", r, r)
+        own = column[rows] >= 0
+        d2[np.flatnonzero(own), column[rows][own]] = np.inf  # no self-interaction
+        if not d2.all():
+            raise ValueError("Distance cannot be zero")
+
+        inv_d3 = G * mass[None, :] / (d2 * np.sqrt(d2))
+        rv = 3 * np.einsum("ijk,ijk->ij", r, v) / d2
+        acc[start:start + len(rows)] = np.einsum("ij,ijk->ik", inv_d3, r)
+        jerk[start:start + len(rows)] = np.einsum(
+            "ij,ijk->ik", inv_d3, v - rv[..., None] * r
+        )
+    return acc, jerk
+
+
+def _norm(x: np.ndarray) -> np.ndarray:
+    return np.sqrt(np.einsum("ij,ij->i", x, x))
+
+
+class BlockTimestepper:
+    """Hermite integrator with individual power-of-two block time steps.
+
+    Every call advances the whole system by `dt`. Inside it, each body `i`
+    takes steps of `dt / 2**level[i]`, its level being chosen from Aarseth's
+    criterion on the acceleration and its derivatives, so that bodies in close
+    encounters are sub-stepped while the others take large steps. Only the
+    bodies whose step ends at the next block time are evaluated, against the
+    predicted positions of all the others. All the bodies are synchronised
+    again at the end of the call, which is what `Simulation.loop` renders.
+
+    The instance is an `update(state, dt)` callback for `Simulation.loop`,
+    `level` holds the current level of every body. `evaluations` counts the
+    accelerations computed so far and `block_steps` the force passes they
+    were computed in, one per block time, and `report` compares
+    `evaluations` with a fixed step run at the smallest step used.
+    """
+
+    def __init__(self, eta: float = ETA, max_level: int = MAX_LEVEL):
+        self.eta = eta
+        self.max_level = max_level
+        self.time = 0.0
+        self.evaluations = 0
+        self.block_steps = 0
+        self.fixed_step_evaluations = 0
+        self.smallest_step = np.inf
+        self.level: Optional[np.ndarray] = None
+        self._jerk: Optional[np.ndarray] = None
+        self._last: Optional[SystemState] = None
+
+    def _levels(self, dt_wanted: np.ndarray, dt: float) -> np.ndarray:
+        with np.errstate(divide="ignore"):
+            level = np.ceil(np.log2(dt / dt_wanted))
+        return np.clip(level, 0, self.max_level).astype(int)
+
+    def _initial_levels(
+        self, acc: np.ndarray, jerk: np.ndarray, dt: float
+    ) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            dt_wanted = self.eta * _norm(acc) / _norm(jerk)
+        return self._levels(np.where(np.isfinite(dt_wanted), dt_wanted, dt), dt)
+
+    def __call__(self, state: SystemState, dt: float) -> SystemState:
+        moving = np.flatnonzero(~state.fixed)
+        if not len(moving):
+            return state
+        pos, vel = state.pos.copy(), state.vel.copy()
+
+        if state is not self._last or self._jerk is None:
+            acc, jerk = np.zeros_like(pos), np.zeros_like(pos)
+            acc[moving], jerk[moving] = accelerations_and_jerks(
+                pos, vel, state.mass, moving
+            )
+            self.evaluations += len(moving)
+            self.block_steps += 1
+            self.level = self._initial_levels(acc, jerk, dt)
+        else:
+            acc, jerk = state.acc.copy(), self._jerk.copy()
+
+        # times are counted in ticks of dt / 2**max_level to stay exact
+        end = 2 ** self.max_level
+        t = np.zeros(len(pos), dtype=np.int64)
+        level = self.level
+        while True:
+            step = 2 ** (self.max_level - level)
+            next_t = np.where(state.fixed, end, t + step)
+            now = next_t[moving].min()
+            active = moving[next_t[moving] == now]
+            h_active = step[active] * dt / end
+
+            # predict every moving body to the block time
+            h = ((now - t) * dt / end)[:, None]
+            predicted_pos = np.where(
+                state.fixed[:, None], pos,
+                pos + h * (vel + h * (acc / 2 + h * jerk / 6)),
+            )
+            predicted_vel = np.where(
+                state.fixed[:, None], vel, vel + h * (acc + h * jerk / 2)
+            )
+
+            new_acc, new_jerk = accelerations_and_jerks(
+                predicted_pos, predicted_vel, state.mass, active
+            )
+            self.evaluations += len(active)
+            self.block_steps += 1
+
+            # Hermite corrector on the active bodies
+            a0, j0, hh = acc[active], jerk[active], h_active[:, None]
+            new_vel = vel[active] + (a0 + new_acc) * hh / 2 + \
+                (j0 - new_jerk) * hh ** 2 / 12
+            pos[active] = pos[active] + (vel[active] + new_vel) * hh / 2 + \
+                (a0 - new_acc) * hh ** 2 / 12
+            vel[active] = new_vel
+
+            # Aarseth criterion from the interpolated higher derivatives
+            snap = (-6 * (a0 - new_acc) - hh * (4 * j0 + 2 * new_jerk)) / hh ** 2
+            crackle = (12 * (a0 - new_acc) + 6 * hh * (j0 + new_jerk)) / hh ** 3
+            snap = snap + hh * crackle
+            with np.errstate(divide="ignore", invalid="ignore"):
+                dt_wanted = np.sqrt(self.eta * (
+                    _norm(new_acc) * _norm(snap) + _norm(new_jerk) ** 2
+                ) / (
+                    _norm(new_jerk) * _norm(crackle) + _norm(snap) ** 2
+                ))
+            dt_wanted = np.where(np.isfinite(dt_wanted), dt_wanted, dt)
+            wanted = self._levels(dt_wanted, dt)
+
+            # smaller steps are always allowed, larger ones by a factor 2 only
+            # and when the body is at a time commensurate with the new step
+            current = level[active]
+            commensurate = now % (2 * step[active]) == 0
+            level[active] = np.where(
+                wanted >= current, wanted,
+                np.where(commensurate, current - 1, current),
+            )
+            acc[active], jerk[active], t[active] = new_acc, new_jerk, now
+            self.smallest_step = min(
+                self.smallest_step, dt / 2 ** int(level[moving].max())
+            )
+            if (t[moving] == end).all():
+                break
+
+        self.time += dt
+        self.fixed_step_evaluations = int(
+            round(self.time / self.smallest_step)
+        ) * len(moving)
+        self.level = level
+        self._jerk = jerk
+        self._last = state.replace(pos, vel, acc)
+        return self._last
+
+    def checkpoint_state(self) -> Dict[str, np.ndarray]:
+        """Copy of the internal state, for `nbody.checkpoint`."""
+        if self._jerk is None:
+            return {}
+        return {
+            "time": np.float64(self.time),
+            "evaluations": np.int64(self.evaluations),
+            "block_steps": np.int64(self.block_steps),
+            "fixed_step_evaluations": np.int64(self.fixed_step_evaluations),
+            "smallest_step": np.float64(self.smallest_step),
+            "level": self.level.copy(),
+            "jerk": self._jerk.copy(),
+        }
+
+    def restore(self, values: Dict[str, np.ndarray], state: SystemState):
+        """Take back the internal state saved with `state`, the next call
+        then continues exactly like the run it was saved from."""
+        if not values:
+            return
+        self.time = float(values["time"])
+        self.evaluations = int(values["evaluations"])
+        # absent from the checkpoints written before it was counted
+        self.block_steps = int(values.get("block_steps", 0))
+        self.fixed_step_evaluations = int(values["fixed_step_evaluations"])
+        self.smallest_step = float(values["smallest_step"])
+        self.level = values["level"].copy()
+        self._jerk = values["jerk"].copy()
+        self._last = state
+
+    def report(self) -> Dict[str, float]:
+        """Force evaluations done so far and saved with respect to a fixed step
+        run at the smallest step used, one evaluation being the acceleration of
+        one body."""
+        saved = self.fixed_step_evaluations - self.evaluations
+        return {
+            "evaluations": self.evaluations,
+            "fixed_step_evaluations": self.fixed_step_evaluations,
+            "saved": saved,
+            "saved_fraction": (
+                saved / self.fixed_step_evaluations
+                if self.fixed_step_evaluations else 0.0
+            ),
+        }
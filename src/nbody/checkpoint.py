@@ -0,0 +1,233 @@
+"""
+Checkpoints of a run, to resume it after an interruption or to fork new runs
+from it:
+
+    python headless.py solar_system --steps 1000000 --checkpoint run.ckpt \
+        --checkpoint-every 10000
+    python headless.py --resume run.ckpt --steps 1000000
+
+A checkpoint is an uncompressed `.npz` archive holding the arrays of the
+`SystemState` (accelerations included), the step counter, the time and the
+internal state of the update callback, so that a resumed run continues
+bit-identically. Update callbacks with an internal state, like
+`BlockTimestepper`, provide it through `checkpoint_state()` and take it back
+with `restore(values, state)`. The trails of `Simulation` and the statistics
+of `Diagnostics` can be saved too.
+
+Files are written to a temporary file and then renamed, so a checkpoint is
+either the previous one or the new one, never a partial file, even when the
+process dies while writing it.
+"""
+from typing import Any, Callable, Deque, Dict, Optional
+from collections import deque
+from dataclasses import dataclass, field
+import json
+import os
+import threading
+
+import numpy as np
+
+from .core import SystemState
+
+FORMAT = 1  # Version of the layout of the archives.
+
+
+@dataclass
+class Checkpoint:
+    state: SystemState
+    step: int
+    time: float
+    dt: float
+    # name of the scenario, to build the update callback again on resume
+    scenario: Optional[str] = None
+    update_state: Dict[str, np.ndarray] = field(default_factory=dict)
+    trails: Dict[str, np.ndarray] = field(default_factory=dict)
+    # see `Diagnostics.checkpoint_state`
+    diagnostics: Dict[str, np.ndarray] = field(default_factory=dict)
+
+
+def save_checkpoint(path: str, checkpoint: Checkpoint):
+    """Write `checkpoint` to `path` atomically."""
+    state = checkpoint.state
+    if not isinstance(state, SystemState):
+        raise ValueError("checkpoints can only be written for a SystemState")
+    arrays = {
+        "pos": state.pos,
+        "vel": state.vel,
+        "mass": state.mass,
+        "density": state.density,
+        "color": np.array(state.color, dtype=np.int64).reshape(len(state), 3),
+        "fixed": state.fixed,
+    }
+    if state.acc is not None:
+        arrays["acc"] = state.acc
+    for key, value in checkpoint.update_state.items():
+        arrays["update." + key] = np.asarray(value)
+    for key, value in checkpoint.trails.items():
+        arrays["trails." + key] = np.asarray(value)
+    for key, value in checkpoint.diagnostics.items():
+        arrays["diagnostics." + key] = np.asarray(value)
+    meta = {
+        "format": FORMAT,
+        "step": checkpoint.step,
+        "time": checkpoint.time,
+        "dt": checkpoint.dt,
+        "scenario": checkpoint.scenario,
+    }
+    arrays["meta"] = np.frombuffer(json.dumps(meta).encode(), dtype=np.uint8)
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as f:
+        np.savez(f, **arrays)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporary, path)
+
+
+def load_checkpoint(path: str) -> Checkpoint:
+    with np.load(path) as data:
+        meta = json.loads(data["meta"].tobytes())
+        if meta.get("format") != FORMAT:
+            raise ValueError(
+                f"unsupported checkpoint format {meta.get('format')} in '{path}', "
+                f"expected {FORMAT}"
+            )
+        state = SystemState(
+            pos=data["pos"],
+            vel=data["vel"],
+            mass=data["mass"],
+            density=data["density"],
+            color=[tuple(c) for c in data["color"].tolist()],
+            fixed=data["fixed"],
+            acc=data["acc"] if "acc" in data else None,
+        )
+        groups: Dict[str, Dict[str, np.ndarray]] = {
+            "update": {}, "trails": {}, "diagnostics": {}
+        }
+        for key in data.files:
+            group, _, name = key.partition(".")
+            if group in groups and name:
+                groups[group][name] = data[key]
+    return Checkpoint(
+        state=state,
+        step=meta["step"],
+        time=meta["time"],
+        dt=meta["dt"],
+        scenario=meta["scenario"],
+        update_state=groups["update"],
+        trails=groups["trails"],
+        diagnostics=groups["diagnostics"],
+    )
+
+
+class CheckpointWriter:
+    """Sink writing a checkpoint every `every` steps from a background thread.
+
+    The step loop only takes a reference to the state, which is never
+    modified once returned by `update`, and copies the internal state of
+    `update` and the trails, the archive itself is written by the thread.
+    `path` can contain `{step}` to keep every checkpoint, e.g.
+    `run-{step}.ckpt`, otherwise each one replaces the previous one and a
+    checkpoint still waiting to be written is dropped for the new one.
+
+    Steps are counted from `start`, the step of the initial state, and a
+    checkpoint is written whenever a multiple of `every` is reached or
+    passed, so the sink also works when it does not see every step.
+    `close` writes the last state seen if it is not saved yet, with `every`
+    set to 0 it is the only checkpoint written. The statistics of
+    `diagnostics`, a `Diagnostics`, are saved with the states.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        dt: float,
+        every: int,
+        scenario: Optional[str] = None,
+        update: Optional[Callable[[Any, float], Any]] = None,
+        start: int = 0,
+        diagnostics: Optional[Any] = None,
+    ):
+        if every < 0:
+            raise ValueError(f"checkpoint interval must be positive, got {every}")
+        self.path = path
+        self.dt = dt
+        self.every = every
+        self.scenario = scenario
+        self.update = update
+        self.diagnostics = diagnostics
+        self.written = start  # step of the last checkpoint requested
+        self.skipped = 0  # checkpoints dropped before being written
+        self.error: Optional[BaseException] = None
+
+        self._latest = None
+        self._pending: Deque[Checkpoint] = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def __call__(self, step: int, t: float, state: SystemState, trails=None):
+        if self.error is not None:
+            raise self.error
+        self._latest = (step, t, state, trails)
+        if self.every and step // self.every > self.written // self.every:
+            self._request(self._snapshot(step, t, state, trails))
+
+    def _snapshot(
+        self, step: int, t: float, state: SystemState, trails
+    ) -> Checkpoint:
+        update_state = {}
+        if hasattr(self.update, "checkpoint_state"):
+            update_state = self.update.checkpoint_state()
+        return Checkpoint(
+            state=state,
+            step=step,
+            time=t,
+            dt=self.dt,
+            scenario=self.scenario,
+            update_state=update_state,
+            trails={} if trails is None else trails.checkpoint_state(),
+            diagnostics=(
+                {} if self.diagnostics is None
+                else self.diagnostics.checkpoint_state()
+            ),
+        )
+
+    def _request(self, checkpoint: Checkpoint):
+        self.written = checkpoint.step
+        with self._lock:
+            if self._pending and "{step}" not in self.path:
+                self.skipped += len(self._pending)
+                self._pending.clear()
+            self._pending.append(checkpoint)
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                checkpoint = self._pending.popleft() if self._pending else None
+                if checkpoint is None:
+                    if self._closing:
+                        return
+                    # cleared under the lock so that no request is missed
+                    self._wake.clear()
+            if checkpoint is None:
+                self._wake.wait()
+                continue
+            try:
+                save_checkpoint(self.path.format(step=checkpoint.step), checkpoint)
+            except BaseException as e:
+                self.error = e
+                return
+
+    def close(self):
+        if self._latest is not None and self._latest[0] > self.written:
+            self._request(self._snapshot(*self._latest))
+        with self._lock:
+            self._closing = True
+        self._wake.set()
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
@@ -0,0 +1,214 @@
+"""
+Collisions: bodies whose spheres overlap are merged into one body, conserving
+mass and momentum.
+
+The overlapping pairs are found with a spatial hash: every body is put in the
+cell of a uniform grid whose cells are as large as the largest pair of radii,
+and only the bodies of the same and of the neighbouring cells are tested,
+O(N log N) for bodies of similar sizes. The few bodies much larger than the others,
+a star among planetesimals, are tested against all the bodies instead, so
+that they do not force a coarse grid on everyone.
+
+Collisions are enabled in a scenario with `"collisions": true`, or by
+wrapping any update callback:
+
+    update = Collisions(make_update())
+"""
+from typing import Any, Callable, Dict, Optional, Tuple
+from itertools import product
+from math import pi
+
+import numpy as np
+
+from .core import SystemState
+
+# Bodies larger than this many times the median radius are tested against all
+# the bodies instead of going through the grid.
+LARGE_RADIUS = 4.0
+
+# Offsets of the cell itself and of half of its 26 neighbours, the other half
+# finds the same pairs from the other side.
+NEIGHBORS = np.array(
+    [o for o in product((-1, 0, 1), repeat=3) if o >= (0, 0, 0)], dtype=np.int64
+)
+
+
+def radii(mass: np.ndarray, density: np.ndarray) -> np.ndarray:
+    """Radius of spheres of the given mass and density."""
+    return (3 * mass / (4 * pi * density)) ** (1 / 3)
+
+
+def _hash(cells: np.ndarray) -> np.ndarray:
+    """64 bit key of (M, 3) integer cell coordinates. Two cells can share a
+    key, their bodies are then tested against each other for nothing."""
+    return (
+        (cells[:, 0] * 73856093) ^ (cells[:, 1] * 19349663) ^ (cells[:, 2] * 83492791)
+    )
+
+
+def _grid_pairs(pos: np.ndarray, radius: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Candidate pairs (i, j) of bodies in the same or neighbouring cells."""
+    size = 2 * radius.max()
+    cells = np.floor(pos / size).astype(np.int64)
+    keys = _hash(cells)
+    order = np.argsort(keys)
+    # bodies of every occupied cell: order[start:start + count]
+    occupied, start, count = np.unique(
+        keys[order], return_index=True, return_counts=True
+    )
+
+    first, second = [], []
+    for offset in NEIGHBORS:
+        neighbor = _hash(cells + offset)
+        cell = np.minimum(np.searchsorted(occupied, neighbor), len(occupied) - 1)
+        found = occupied[cell] == neighbor
+        n = np.where(found, count[cell], 0)
+        total = n.sum()
+        if not total:
+            continue
+        # every body i against the `n[i]` bodies of its neighbour cell
+        i = np.repeat(np.arange(len(pos)), n)
+        within = np.arange(total) - np.repeat(np.cumsum(n) - n, n)
+        j = order[np.repeat(start[cell], n) + within]
+        keep = i < j if not offset.any() else i != j
+        first.append(i[keep])
+        second.append(j[keep])
+    if not first:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(first), np.concatenate(second)
+
+
+def find_collisions(pos: np.ndarray, radius: np.ndarray) -> np.ndarray:
+    """(M, 2) array of the pairs (i, j), i < j, of overlapping bodies.
+
+    Args:
+        pos: (N, 3) array of positions.
+        radius: (N,) array of radii, bodies of radius 0 only collide with
+            bodies of positive radius.
+    """
+    pairs = [np.empty((0, 2), dtype=np.int64)]
+    positive = radius > 0
+    large = radius > LARGE_RADIUS * np.median(radius[positive]) if positive.any() \
+        else positive
+
+    small = np.flatnonzero(positive & ~large)
+    if len(small) > 1:
+        i, j = _grid_pairs(pos[small], radius[small])
+        i, j = small[i], small[j]
+        pairs.append(np.stack([np.minimum(i, j), np.maximum(i, j)], axis=1))
+
+    for i in np.flatnonzero(large):
+        r = pos - pos[i]
+        hit = np.flatnonzero(
+            np.einsum("ij,ij->i", r, r) < (radius + radius[i]) ** 2
+        )
+        hit = hit[hit != i]
+        pairs.append(np.stack([np.minimum(hit, i), np.maximum(hit, i)], axis=1))
+
+    pairs = np.concatenate(pairs)
+    if len(pairs) and len(small) > 1:
+        # grid candidates are only close, keep the overlapping ones
+        r = pos[pairs[:, 0]] - pos[pairs[:, 1]]
+        overlap = np.einsum("ij,ij->i", r, r) < (
+            radius[pairs[:, 0]] + radius[pairs[:, 1]]
+        ) ** 2
+        pairs = pairs[overlap]
+    return np.unique(pairs, axis=0)
+
+
+def _groups(n: int, pairs: np.ndarray) -> np.ndarray:
+    """Label of the connected component of every body, the smallest index of
+    the component, so that chains of overlapping bodies merge together."""
+    labels = np.arange(n)
+    while True:
+        low = np.minimum(labels[pairs[:, 0]], labels[pairs[:, 1]])
+        new = labels.copy()
+        np.minimum.at(new, pairs[:, 0], low)
+        np.minimum.at(new, pairs[:, 1], low)
+        new = new[new]
+        if np.array_equal(new, labels):
+            return labels
+        labels = new
+
+
+def merge_collisions(state: SystemState) -> Tuple[SystemState, Optional[np.ndarray]]:
+    """Merge every group of overlapping bodies into one body.
+
+    The merged body has the total mass and volume of the group, sits at its
+    center of mass and moves with its momentum. It takes the place and the
+    color of the most massive body of the group, or of its pinned body, a
+    pinned body staying where it is.
+
+    Returns:
+        the new state, the same object when nothing collides, and the indices
+        in `state` of the bodies kept, None when nothing collides.
+    """
+    n = len(state)
+    pairs = find_collisions(state.pos, radii(state.mass, state.density))
+    if not len(pairs):
+        return state, None
+
+    group = np.unique(_groups(n, pairs), return_inverse=True)[1]
+    mass = state.mass
+    total = np.bincount(group, mass)
+    center = np.stack(
+        [np.bincount(group, mass * state.pos[:, k]) for k in range(3)], axis=1
+    ) / total[:, None]
+    momentum = np.stack(
+        [np.bincount(group, mass * state.vel[:, k]) for k in range(3)], axis=1
+    )
+    volume = np.bincount(group, mass / state.density)
+    pinned = np.bincount(group, state.fixed) > 0
+
+    # the body of every group keeping its place: pinned first, then heaviest
+    order = np.lexsort((mass, state.fixed, group))
+    last = np.r_[np.flatnonzero(np.diff(group[order])), n - 1]
+    kept = np.sort(order[last])
+
+    g = group[kept]
+    merged = (np.bincount(group) > 1)[g]
+    moved = merged & ~pinned[g]
+    pos, vel = state.pos[kept], state.vel[kept]
+    pos[moved] = center[g[moved]]
+    vel[moved] = momentum[g[moved]] / total[g[moved], None]
+    new_mass = mass[kept]
+    new_mass[merged] = total[g[merged]]
+    density = state.density[kept]
+    density[merged] = total[g[merged]] / volume[g[merged]]
+
+    return SystemState(
+        pos=pos,
+        vel=vel,
+        mass=new_mass,
+        density=density,
+        color=[state.color[i] for i in kept.tolist()],
+        fixed=state.fixed[kept],
+    ), kept
+
+
+class Collisions:
+    """Update callback calling `update` and then merging the bodies that
+    overlap, see `merge_collisions`.
+
+    `kept` holds the indices of the bodies kept by the last call, None when
+    nothing merged, for the callers tracking bodies by index like
+    `Simulation.loop`. `merges` counts the bodies merged into another one.
+    """
+
+    def __init__(self, update: Callable[[SystemState, float], SystemState]):
+        self.update = update
+        self.kept: Optional[np.ndarray] = None
+        self.merges = 0
+
+    def __call__(self, state: SystemState, dt: float) -> SystemState:
+        new = self.update(state, dt)
+        new, self.kept = merge_collisions(new)
+        if self.kept is not None:
+            self.merges += len(state) - len(new)
+        return new
+
+    def report(self) -> Dict[str, Any]:
+        report = {"merges": self.merges}
+        if hasattr(self.update, "report"):
+            report.update(self.update.report())
+        return report
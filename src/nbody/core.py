@@ -0,0 +1,352 @@
+from typing import Any, Callable, Iterable, Iterator, List, Optional, Tuple
+from dataclasses import dataclass
+
+import numpy as np
+
+from vec3 import Vec3Array, Vector3d
+
+G = 6.67e-11  # Gravitational constant in m^3 kg^-1 s^-2.
+
+# Number of target rows handled at once by the pairwise kernel, this bounds the
+# size of the (3, N, rows) temporaries to a few MB for thousands of bodies.
+BLOCK_SIZE = 64
+# Number of (source, test particle) pairs handled at once by the field kernel,
+# test particles only see the few massive bodies so far more of them fit.
+FIELD_BLOCK = 65536
+
+Color = Tuple[int, int, int]
+Accelerations = Callable[[np.ndarray, np.ndarray], np.ndarray]
+Integrator = Callable[["SystemState", float, Accelerations], "SystemState"]
+
+
+def direct_accelerations(
+    pos: np.ndarray,
+    mass: np.ndarray,
+    targets: Optional[np.ndarray] = None,
+    potential: Optional[np.ndarray] = None,
+    eps: float = 0.0,
+) -> np.ndarray:
+    """Compute the gravitational acceleration of every body by direct summation.
+
+    The arithmetic mirrors `body.force` followed by `force / mass` operation by
+    operation, and the forces of every target are summed one source after the
+    other in index order, like the original `update` loop, whatever the block
+    or the targets the target is computed with. The squares are products
+    where the object code calls `pow` through `x ** 2`, which can differ in
+    the last bit, so the results agree with the object based code to rounding
+    rather than bit for bit.
+
+    Args:
+        pos: (N, 3) array of positions.
+        mass: (N,) array of masses.
+        targets: optional indices of the bodies whose acceleration is wanted,
+            all the bodies by default.
+        potential: optional (len(targets),) array receiving the potential
+            energy -G m_i sum_j m_j / r_ij of every target, computed from the
+            same pair distances as the forces.
+        eps: Plummer softening length, the distances r_ij become
+            sqrt(r_ij^2 + eps^2) in the forces and the potential, so that
+            close encounters of particles standing for a continuous medium,
+            e.g. a disk, stay smooth. 0 for the exact Newtonian forces.
+
+    Returns:
+        (N, 3) array of accelerations, or (len(targets), 3) if `targets` is
+        given.
+    """
+    if targets is None:
+        targets = np.arange(len(mass))
+    if not mass.all():
+        return _massive_sources(pos, mass, targets, potential, eps)
+    acc = np.empty((len(targets), 3))
+    # component-major copy so that the temporaries are contiguous per axis
+    components = np.ascontiguousarray(pos.T)
+    for start in range(0, len(targets), BLOCK_SIZE):
+        stop = min(start + BLOCK_SIZE, len(targets))
+        rows = targets[start:stop]
+        # (3, N, rows) arrays: axis 1 is the source body `other` and axis 2 the
+        # target body `self`, reducing along axis 1 adds the pair forces one
+        # source after the other, like `total_force += body.force(...)`.
+        r = components[:, :, None] - components[:, None, rows]
+        distance = r[0] ** 2 + r[1] ** 2
+        distance += r[2] ** 2
+        if eps:
+            distance += eps ** 2
+        np.sqrt(distance, out=distance)
+
+        distance[rows, np.arange(len(rows))] = np.inf  # no self-interaction
+        if not distance.all():
+            raise ValueError("Distance cannot be zero")
+
+        if potential is not None:
+            potential[start:stop] = (
+                -G * mass[rows] * _sum_sources(mass[:, None] / distance, axis=0)
+            )
+
+        force_magnitude = G * mass[None, rows] * mass[:, None]
+        force_magnitude /= distance ** 2
+        r /= distance
+        r *= force_magnitude
+        acc[start:stop] = (_sum_sources(r, axis=1) / mass[rows]).T
+    return acc
+
+
+def _sum_sources(terms: np.ndarray, axis: int) -> np.ndarray:
+    """Sum of the pair terms over the sources, the `axis` before the last one,
+    adding the sources one after the other in index order.
+
+    With several targets along the last axis `np.add.reduce` runs its inner
+    loop over the targets and adds the sources in order, but with a single
+    target it sums the sources pairwise, so that case is accumulated.
+    """
+    if terms.shape[-1] == 1:
+        return np.add.accumulate(terms, axis=axis)[(slice(None),) * axis + (-1,)]
+    return np.add.reduce(terms, axis=axis)
+
+
+def _massive_sources(
+    pos: np.ndarray,
+    mass: np.ndarray,
+    targets: np.ndarray,
+    potential: Optional[np.ndarray],
+    eps: float = 0.0,
+) -> np.ndarray:
+    """`direct_accelerations` when some bodies are massless test particles:
+    only the massive bodies are sources, so the cost is O(N_massive) per
+    target, and the massive bodies evolve exactly as without the test
+    particles."""
+    sources = np.flatnonzero(mass)
+    acc = np.zeros((len(targets), 3))
+    if potential is not None:
+        potential[:] = 0.0
+    if not len(sources):
+        return acc
+
+    heavy = mass[targets] != 0
+    if heavy.any():
+        column = np.cumsum(mass != 0) - 1  # index of every massive body in sources
+        heavy_potential = None if potential is None else np.empty(heavy.sum())
+        acc[heavy] = direct_accelerations(
+            pos[sources], mass[sources], column[targets[heavy]], heavy_potential, eps
+        )
+        if potential is not None:
+            potential[heavy] = heavy_potential
+    if not heavy.all():
+        acc[~heavy] = gravity_field(
+            pos[sources], mass[sources], pos[targets[~heavy]], eps
+        )
+    return acc
+
+
+def gravity_field(
+    pos: np.ndarray,
+    mass: np.ndarray,
+    points: np.ndarray,
+    eps: float = 0.0,
+) -> np.ndarray:
+    """Gravitational acceleration created at `points` by the bodies at `pos`,
+    e.g. felt by test particles, by direct summation.
+
+    Args:
+        pos: (N, 3) array of positions of the sources.
+        mass: (N,) array of masses of the sources.
+        points: (M, 3) array of positions where the field is wanted.
+        eps: Plummer softening length, see `direct_accelerations`.
+
+    Returns:
+        (M, 3) array of accelerations.
+    """
+    acc = np.empty((len(points), 3))
+    components = np.ascontiguousarray(pos.T)
+    block = max(1, FIELD_BLOCK // max(len(mass), 1))
+    for start in range(0, len(points), block):
+        # (3, N, rows) arrays: axis 1 is the source and axis 2 the point
+        r = components[:, :, None] - points[start:start + block].T[:, None, :]
+        distance = r[0] ** 2 + r[1] ** 2
+        distance += r[2] ** 2
+        if eps:
+            distance += eps ** 2
+        if not distance.all():
+            raise ValueError("Distance cannot be zero")
+        magnitude = G * mass[:, None] / (distance * np.sqrt(distance))
+        r *= magnitude
+        acc[start:start + block] = _sum_sources(r, axis=1).T
+    return acc
+
+
+class DirectSum:
+    """Direct-sum force backend with a Plummer softening length `eps`, to be
+    given to `make_update`, see `direct_accelerations`."""
+
+    def __init__(self, eps: float = 0.0):
+        self.eps = eps
+
+    def __call__(self, pos: np.ndarray, mass: np.ndarray) -> np.ndarray:
+        return direct_accelerations(pos, mass, eps=self.eps)
+
+
+@dataclass
+class BodyView:
+    """Read-only view of one body of a `SystemState`, as seen by the renderer."""
+    pos: Vector3d
+    vel: Vector3d
+    mass: float
+    density: float
+    color: Color
+
+
+@dataclass
+class SystemState:
+    """Structure-of-arrays storage of a set of bodies.
+
+    Positions and velocities are contiguous (N, 3) arrays, masses and densities
+    are (N,) arrays. Every body has one of three roles:
+
+    - massive bodies attract the others and are attracted by them;
+    - test particles, of mass 0, like asteroids or spacecraft, are attracted
+      by the massive bodies but do not attract anything, so that the force
+      pass costs O(N_massive * N) instead of O(N^2), see `with_test_particles`;
+    - pinned bodies, flagged in `fixed`, stay in place, like the central
+      bodies of several scenarios, and still attract the others.
+
+    `acc` holds the accelerations at the current positions when the
+    integrator already knows them, so that the next step does not have to
+    compute them again.
+
+    The class behaves like the list of bodies expected by `Simulation.loop`:
+    it has a length, can be indexed and iterated, and every item has the `pos`,
+    `color`, `mass` and `density` fields used for rendering.
+    """
+    pos: np.ndarray
+    vel: np.ndarray
+    mass: np.ndarray
+    density: np.ndarray
+    color: List[Color]
+    fixed: np.ndarray
+    acc: Optional[np.ndarray] = None
+
+    @classmethod
+    def from_bodies(
+        cls,
+        bodies: List[Any],
+        fixed: Optional[Iterable[bool]] = None,
+    ) -> "SystemState":
+        """Build the arrays from objects with `pos`, `vel`, `mass`, `density`
+        and `color` fields, e.g. `BodyView` or the `body` classes of older
+        scripts.
+
+        Args:
+            bodies: the bodies to pack.
+            fixed: optional flags telling which bodies are pinned.
+        """
+        pos = Vec3Array.from_vectors(b.pos for b in bodies).data
+        vel = Vec3Array.from_vectors(b.vel for b in bodies).data
+        n = len(bodies)
+        return cls(
+            pos=pos.reshape(n, 3),
+            vel=vel.reshape(n, 3),
+            mass=np.array([b.mass for b in bodies], dtype=float),
+            density=np.array([b.density for b in bodies], dtype=float),
+            color=[b.color for b in bodies],
+            fixed=(
+                np.zeros(n, dtype=bool) if fixed is None
+                else np.array(list(fixed), dtype=bool)
+            ),
+        )
+
+    def to_bodies(self, factory: Callable[..., Any]) -> List[Any]:
+        """Unpack the arrays into objects built as `factory(pos, vel, mass,
+        density, color)`, e.g. `BodyView`."""
+        return [
+            factory(b.pos, b.vel, b.mass, b.density, b.color) for b in self
+        ]
+
+    def replace(
+        self,
+        pos: np.ndarray,
+        vel: np.ndarray,
+        acc: Optional[np.ndarray] = None,
+    ) -> "SystemState":
+        """Return a new state sharing everything but the positions, velocities
+        and accelerations."""
+        return SystemState(
+            pos=pos,
+            vel=vel,
+            mass=self.mass,
+            density=self.density,
+            color=self.color,
+            fixed=self.fixed,
+            acc=acc,
+        )
+
+    def with_test_particles(
+        self,
+        pos: np.ndarray,
+        vel: np.ndarray,
+        color: Color = (150, 150, 150),
+        density: float = 2.0,
+    ) -> "SystemState":
+        """Return a new state with massless test particles at `pos`, moving at
+        `vel`, (M, 3) arrays, appended after the current bodies."""
+        n = len(pos)
+        return SystemState(
+            pos=np.concatenate([self.pos, pos]),
+            vel=np.concatenate([self.vel, vel]),
+            mass=np.concatenate([self.mass, np.zeros(n)]),
+            density=np.concatenate([self.density, np.full(n, density)]),
+            color=self.color + [color] * n,
+            fixed=np.concatenate([self.fixed, np.zeros(n, dtype=bool)]),
+        )
+
+    def __len__(self) -> int:
+        return len(self.mass)
+
+    def __getitem__(self, i: int) -> BodyView:
+        return BodyView(
+            pos=Vector3d(*self.pos[i].tolist()),
+            vel=Vector3d(*self.vel[i].tolist()),
+            mass=float(self.mass[i]),
+            density=float(self.density[i]),
+            color=self.color[i],
+        )
+
+    def __iter__(self) -> Iterator[BodyView]:
+        return (self[i] for i in range(len(self)))
+
+
+def step(
+    state: SystemState,
+    dt: float,
+    accelerations: Accelerations = direct_accelerations,
+) -> SystemState:
+    """Advance the state by `dt` with the semi-implicit Euler step of the
+    original `body.update`, pinned bodies are left untouched."""
+    acceleration = accelerations(state.pos, state.mass)
+    new_velocity = state.vel + acceleration * dt
+    new_position = state.pos + new_velocity * dt
+
+    moving = ~state.fixed
+    vel = np.where(moving[:, None], new_velocity, state.vel)
+    pos = np.where(moving[:, None], new_position, state.pos)
+    return state.replace(pos, vel)
+
+
+def update(state: SystemState, dt: float) -> SystemState:
+    """Semi-implicit Euler step with direct summation, to be given to
+    `Simulation.loop`."""
+    return step(state, dt)
+
+
+def make_update(
+    accelerations: Accelerations = direct_accelerations,
+    integrator: Integrator = step,
+) -> Callable[[SystemState, float], SystemState]:
+    """Build an `update(state, dt)` callback using a custom force backend
+    and integrator, see the `integrators` module. Both are kept as the
+    `accelerations` and `integrator` attributes of the callback, e.g. for
+    `Diagnostics.wrap`."""
+    def _update(state: SystemState, dt: float) -> SystemState:
+        return integrator(state, dt, accelerations)
+
+    _update.accelerations = accelerations
+    _update.integrator = integrator
+    return _update
@@ -0,0 +1,317 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from collections import namedtuple
+
+import numpy as np
+
+from .core import (
+    BLOCK_SIZE,
+    G,
+    Accelerations,
+    DirectSum,
+    SystemState,
+    direct_accelerations,
+    step,
+)
+from .trajectory import state_arrays
+
+EVERY = 100  # Steps between two samples.
+HISTORY = 1000  # Samples kept in the history.
+
+Sample = namedtuple(
+    "Sample",
+    ["step", "time", "kinetic", "potential", "energy", "momentum", "angular_momentum"],
+)
+
+
+def body_arrays(state: Any) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Positions, velocities and masses of a `SystemState` or of a list of
+    bodies."""
+    pos, vel = state_arrays(state)
+    mass = getattr(state, "mass", None)
+    if not isinstance(mass, np.ndarray):
+        mass = np.array([b.mass for b in state], dtype=float)
+    return pos, vel, mass
+
+
+def potential_energy(pos: np.ndarray, mass: np.ndarray, eps: float = 0.0) -> float:
+    """Total gravitational potential energy, skipping the pairs at zero
+    distance like `compute_energy` does, with the softening length `eps` of
+    the forces, see `direct_accelerations`.
+
+    The pairs are processed by blocks of `BLOCK_SIZE` rows so that the
+    temporaries stay small whatever the number of bodies. Massless test
+    particles add nothing and are left out.
+    """
+    if not mass.all():
+        pos, mass = pos[mass != 0], mass[mass != 0]
+    total = 0.0
+    for start in range(0, len(mass), BLOCK_SIZE):
+        stop = min(start + BLOCK_SIZE, len(mass))
+        # only the pairs (i, j) with i < j
+        r = pos[start:stop, None, :] - pos[None, start:, :]
+        distance = np.einsum("ijk,ijk->ij", r, r)
+        upper = np.triu(np.ones(distance.shape, dtype=bool), k=1)
+        upper &= distance > 0
+        distance = np.sqrt(distance + eps ** 2)
+        pairs = mass[start:stop, None] * mass[None, start:]
+        total -= G * np.sum(pairs[upper] / distance[upper])
+    return float(total)
+
+
+def kinetic_energy(vel: np.ndarray, mass: np.ndarray) -> float:
+    return float(0.5 * np.dot(mass, np.einsum("ij,ij->i", vel, vel)))
+
+
+class RunningStats:
+    """Minimum, maximum and drift from the first value of a stream of values,
+    in constant memory."""
+
+    def __init__(self):
+        self.count = 0
+        self.first = self.last = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def add(self, value: float):
+        if self.count == 0:
+            self.first = value
+        self.count += 1
+        self.last = value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    @property
+    def drift(self) -> float:
+        """Change since the first value, relative to it when it is not zero."""
+        change = self.last - self.first
+        return change / abs(self.first) if self.first else change
+
+    def checkpoint_state(self) -> np.ndarray:
+        return np.array([self.count, self.first, self.last, self.min, self.max])
+
+    def restore(self, values: np.ndarray):
+        self.count = int(values[0])
+        self.first, self.last, self.min, self.max = (float(v) for v in values[1:])
+
+    def report(self) -> Dict[str, float]:
+        return {
+            "first": self.first,
+            "last": self.last,
+            "min": self.min,
+            "max": self.max,
+            "drift": self.drift,
+        }
+
+
+class Diagnostics:
+    """Energy, linear and angular momentum of the system, sampled every
+    `every` steps.
+
+    Every sample updates running statistics of the total energy and of the
+    deviation of both momenta from their initial value, and is stored in a
+    history of at most `history` samples. When the history is full every
+    other sample is dropped and the sampling of the history is halved, so it
+    always covers the whole run with bounded memory.
+
+    `wrap` turns an `update(state, dt)` callback into one that also samples
+    the state, for lists of bodies or any update function.
+    `make_update` builds an update for `SystemState` whose samples reuse the
+    pair distances of the force computation instead of a second pass over
+    the pairs, `wrap` uses it for the direct-sum updates of
+    `core.make_update`. With `enabled` set to False both return the plain
+    update. `eps` is the softening length of the forces, used in the
+    potential.
+
+    `checkpoint_state` and `restore` carry the statistics and the reference
+    momenta over checkpoints, so that a resumed run measures the drifts from
+    the start of the original run.
+    """
+
+    def __init__(
+        self,
+        every: int = EVERY,
+        history: int = HISTORY,
+        enabled: bool = True,
+        eps: float = 0.0,
+    ):
+        self.every = every
+        self.eps = eps
+        self.history = history
+        self.enabled = enabled and every > 0
+
+        self.steps = 0
+        self.time = 0.0
+        self.samples: List[Sample] = []
+        self.stride = 1  # samples between two entries of the history
+        self.energy = RunningStats()
+        self.momentum = RunningStats()
+        self.angular_momentum = RunningStats()
+        self._seen = 0
+        self._initial: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    def _due(self) -> bool:
+        return self.steps % self.every == 0
+
+    def record(
+        self,
+        pos: np.ndarray,
+        vel: np.ndarray,
+        mass: np.ndarray,
+        potential: float,
+    ) -> Sample:
+        """Add a sample of the state of the system at the current step."""
+        kinetic = kinetic_energy(vel, mass)
+        momentum = mass @ vel
+        angular_momentum = mass @ np.cross(pos, vel)
+        sample = Sample(
+            step=self.steps,
+            time=self.time,
+            kinetic=kinetic,
+            potential=potential,
+            energy=kinetic + potential,
+            momentum=momentum,
+            angular_momentum=angular_momentum,
+        )
+
+        if self._initial is None:
+            self._initial = (momentum, angular_momentum)
+        initial_momentum, initial_angular_momentum = self._initial
+        self.energy.add(sample.energy)
+        self.momentum.add(float(np.linalg.norm(momentum - initial_momentum)))
+        self.angular_momentum.add(
+            float(np.linalg.norm(angular_momentum - initial_angular_momentum))
+        )
+
+        if self._seen % self.stride == 0:
+            self.samples.append(sample)
+            if len(self.samples) > self.history:
+                self.samples = self.samples[::2]
+                self.stride *= 2
+        self._seen += 1
+        return sample
+
+    def _record_state(self, state: SystemState, potential: np.ndarray):
+        # every pair is counted twice in the potentials of the bodies
+        self.record(state.pos, state.vel, state.mass, 0.5 * float(potential.sum()))
+
+    def sample(self, state: Any) -> Sample:
+        pos, vel, mass = body_arrays(state)
+        return self.record(pos, vel, mass, potential_energy(pos, mass, self.eps))
+
+    def _advance(self, dt: float):
+        self.steps += 1
+        self.time += dt
+
+    def wrap(self, update: Callable[[Any, float], Any]) -> Callable[[Any, float], Any]:
+        """Sample the state given to `update` every `every` steps.
+
+        Updates built by `core.make_update` with the direct-sum forces, and
+        the softening length of the diagnostics, are replaced by
+        `make_update` with the same integrator, which computes the same
+        steps and takes the potential energy from the forces.
+        """
+        if not self.enabled:
+            return update
+        accelerations = getattr(update, "accelerations", None)
+        if (accelerations is direct_accelerations and not self.eps) or (
+            isinstance(accelerations, DirectSum) and accelerations.eps == self.eps
+        ):
+            return self.make_update(update.integrator)
+
+        def _update(state: Any, dt: float) -> Any:
+            if self._due():
+                self.sample(state)
+            self._advance(dt)
+            return update(state, dt)
+
+        return _update
+
+    def make_update(
+        self,
+        integrator: Callable[[SystemState, float, Accelerations], SystemState] = step,
+    ) -> Callable[[SystemState, float], SystemState]:
+        """Build an `update(state, dt)` callback with the direct-sum forces
+        and `integrator`, whose samples take the potential energy from the
+        force computation.
+
+        The potential is kept for the force evaluation done at the positions
+        of the state given to the update, or otherwise at the positions of the
+        state it returns, e.g. for leapfrog which caches the first one. It is
+        only computed separately if the integrator evaluates the forces at
+        neither.
+        """
+        if not self.enabled:
+            return lambda state, dt: integrator(state, dt, DirectSum(self.eps))
+
+        def _update(state: SystemState, dt: float) -> SystemState:
+            if not self._due():
+                self._advance(dt)
+                return integrator(state, dt, DirectSum(self.eps))
+
+            # potential energies by id of the positions they were computed at,
+            # the positions are kept to keep their id valid
+            evaluated: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+
+            def accelerations(pos: np.ndarray, mass: np.ndarray) -> np.ndarray:
+                potential = np.empty(len(mass))
+                acc = direct_accelerations(pos, mass, potential=potential, eps=self.eps)
+                evaluated[id(pos)] = (pos, potential)
+                return acc
+
+            new_state = integrator(state, dt, accelerations)
+            if id(state.pos) in evaluated:
+                _, potential = evaluated[id(state.pos)]
+                self._record_state(state, potential)
+                self._advance(dt)
+            elif id(new_state.pos) in evaluated:
+                _, potential = evaluated[id(new_state.pos)]
+                self._advance(dt)
+                self._record_state(new_state, potential)
+            else:
+                self.sample(state)
+                self._advance(dt)
+            return new_state
+
+        return _update
+
+    def checkpoint_state(self) -> Dict[str, np.ndarray]:
+        """Copy of the statistics and of the reference momenta, for
+        `nbody.checkpoint`, the history of the samples is not saved."""
+        if self._initial is None:
+            return {}
+        momentum, angular_momentum = self._initial
+        return {
+            "energy": self.energy.checkpoint_state(),
+            "momentum": self.momentum.checkpoint_state(),
+            "angular_momentum": self.angular_momentum.checkpoint_state(),
+            "initial_momentum": momentum.copy(),
+            "initial_angular_momentum": angular_momentum.copy(),
+        }
+
+    def restore(self, values: Dict[str, np.ndarray], step: int = 0, time: float = 0.0):
+        """Continue a run from `step` and `time`, with the statistics saved by
+        `checkpoint_state` in `values` when there are some, otherwise the
+        drifts are measured from the first sample."""
+        self.steps, self.time = step, time
+        if not values:
+            return
+        self.energy.restore(values["energy"])
+        self.momentum.restore(values["momentum"])
+        self.angular_momentum.restore(values["angular_momentum"])
+        self._initial = (
+            values["initial_momentum"].copy(),
+            values["initial_angular_momentum"].copy(),
+        )
+
+    def energies(self) -> Tuple[List[int], List[float]]:
+        """Steps and total energies of the history, e.g. for plotting."""
+        return [s.step for s in self.samples], [s.energy for s in self.samples]
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "steps": self.steps,
+            "samples": self.energy.count,
+            "energy": self.energy.report(),
+            "momentum_change": self.momentum.max,
+            "angular_momentum_change": self.angular_momentum.max,
+        }
@@ -0,0 +1,297 @@
+"""
+Ensembles of independent small systems integrated together, for parameter
+sweeps: the members are stacked along a leading batch axis of the arrays of a
+`SystemState`, positions being (B, N, 3), so that one call to any integrator
+of `integrators` advances all of them at once.
+
+    base = load_scenario("binary").initial_state()
+    factors = np.linspace(0.5, 1.5, 1000)
+    states = [base.replace(base.pos, base.vel * f) for f in factors]
+    ensemble = Ensemble(states, integrator="leapfrog")
+    ensemble.run(dt=10000, steps=100000)
+    ensemble.status, ensemble.ended, ensemble.drift()
+
+Only the integrators of `BATCHED_INTEGRATORS` work on the batched arrays, the
+Kepler ones and `BlockTimestepper` do not.
+
+Members where two bodies touch (collided) or where a body leaves the system
+(escaped) are terminated and removed from the arrays, the others keep running
+on the smaller arrays.
+"""
+from typing import Any, Dict, List, Optional, Union
+from math import pi
+
+import numpy as np
+
+from .core import G, Integrator, SystemState
+from .integrators import INTEGRATORS, get_integrator
+
+# Integrators of `integrators` whose arithmetic works on (B, N, 3) arrays.
+BATCHED_INTEGRATORS = ("euler", "leapfrog", "velocity_verlet", "yoshida4")
+ESCAPE_FACTOR = 10.0  # Escape distance, in initial sizes of every member.
+
+RUNNING, ESCAPED, COLLIDED = 0, 1, 2
+STATUS = ("running", "escaped", "collided")  # Names of the status codes.
+
+
+def batched_accelerations(pos: np.ndarray, mass: np.ndarray) -> np.ndarray:
+    """Accelerations of every body of every member by direct summation.
+
+    The operations and the summation order are those of
+    `direct_accelerations`, so every member evolves bit-identically to the
+    same system integrated alone. Bodies at zero distance give infinite or
+    NaN accelerations instead of an error, they are caught by the collision
+    check of `Ensemble`.
+
+    Args:
+        pos: (B, N, 3) array of positions.
+        mass: (B, N) array of masses.
+
+    Returns:
+        (B, N, 3) array of accelerations.
+    """
+    n = mass.shape[1]
+    components = np.ascontiguousarray(pos.transpose(0, 2, 1))  # (B, 3, N)
+    # (B, 3, N, N) arrays, axis 2 is the source body and axis 3 the target
+    r = components[:, :, :, None] - components[:, :, None, :]
+    distance = r[:, 0] ** 2 + r[:, 1] ** 2
+    distance += r[:, 2] ** 2
+    np.sqrt(distance, out=distance)
+    distance[:, np.arange(n), np.arange(n)] = np.inf  # no self-interaction
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        force_magnitude = G * mass[:, None, :] * mass[:, :, None]
+        force_magnitude /= distance ** 2
+        r /= distance[:, None]
+        r *= force_magnitude[:, None]
+        acc = np.add.reduce(r, axis=2) / mass[:, None, :]
+    return acc.transpose(0, 2, 1)
+
+
+def batched_energy(
+    pos: np.ndarray, vel: np.ndarray, mass: np.ndarray
+) -> np.ndarray:
+    """(B,) array of the total energy of every member."""
+    kinetic = 0.5 * np.einsum("bi,bij,bij->b", mass, vel, vel)
+    r = pos[:, :, None] - pos[:, None, :]
+    distance = np.sqrt(np.einsum("bijk,bijk->bij", r, r))
+    # only the pairs (i, j) with i < j
+    distance[:, ~np.triu(np.ones(distance.shape[1:], dtype=bool), k=1)] = np.inf
+    pairs = mass[:, :, None] * mass[:, None, :]
+    return kinetic - G * np.sum(pairs / distance, axis=(1, 2))
+
+
+def batched_momentum(vel: np.ndarray, mass: np.ndarray) -> np.ndarray:
+    """(B, 3) array of the total momentum of every member."""
+    return np.einsum("bi,bij->bj", mass, vel)
+
+
+def _center(x: np.ndarray, mass: np.ndarray) -> np.ndarray:
+    """(B, 1, 3) mass weighted mean of `x` over the bodies of every member."""
+    return (np.einsum("bi,bij->bj", mass, x) / mass.sum(axis=1)[:, None])[:, None]
+
+
+class Ensemble:
+    """Independent systems of the same number of bodies integrated along a
+    batch axis.
+
+    Every `check_every` steps the running members are checked for collisions,
+    two bodies closer than the sum of their radii, and escapes, a body
+    farther than `escape_distance` from the center of mass of its member and
+    unbound from the rest of the mass, seen as a point at the center of mass.
+    Terminated members keep their last state in `pos` and `vel`, their status
+    in `status` and the step of the termination in `ended`.
+
+    Args:
+        states: the members, with the same number of bodies and the same
+            pinned bodies.
+        integrator: an integrator of `BATCHED_INTEGRATORS` or its name.
+        escape_distance: distance from the center of mass beyond which a body
+            can escape, `ESCAPE_FACTOR` times the initial size of every member
+            by default.
+        radius: radius of the bodies for the collisions, a number or an
+            array broadcast to (B, N), computed from the mass and the density
+            of the bodies by default. 0 disables the collisions.
+        check_every: steps between two checks of the terminations.
+    """
+
+    def __init__(
+        self,
+        states: List[SystemState],
+        integrator: Union[str, Integrator] = "euler",
+        escape_distance: Optional[float] = None,
+        radius: Optional[Union[float, np.ndarray]] = None,
+        check_every: int = 1,
+    ):
+        if not states:
+            raise ValueError("an ensemble needs at least one member")
+        first = states[0]
+        if any(
+            len(s) != len(first) or not np.array_equal(s.fixed, first.fixed)
+            for s in states
+        ):
+            raise ValueError(
+                "the members of an ensemble must have the same bodies pinned "
+                "and the same number of bodies"
+            )
+        self.integrator = (
+            get_integrator(integrator) if isinstance(integrator, str) else integrator
+        )
+        batched = [INTEGRATORS[name] for name in BATCHED_INTEGRATORS]
+        if not any(self.integrator is i for i in batched):
+            raise ValueError(
+                f"integrator {integrator!r} cannot integrate an ensemble, "
+                f"expected one of {', '.join(BATCHED_INTEGRATORS)}"
+            )
+        self.check_every = check_every
+        self.steps = 0
+        self.time = 0.0
+
+        # state of every member, the running ones are only copied back here
+        # when they terminate or when `sync` is called
+        self.pos = np.stack([s.pos for s in states])
+        self.vel = np.stack([s.vel for s in states])
+        self.mass = np.stack([s.mass for s in states])
+        self.density = np.stack([s.density for s in states])
+        if radius is None:
+            radius = (3 * self.mass / (4 * pi * self.density)) ** (1 / 3)
+        self.radius = np.broadcast_to(radius, self.mass.shape)
+        self.status = np.full(len(states), RUNNING, dtype=np.int8)
+        self.ended = np.full(len(states), -1, dtype=np.int64)
+        self.initial_energy = batched_energy(self.pos, self.vel, self.mass)
+        self.initial_momentum = batched_momentum(self.vel, self.mass)
+
+        if escape_distance is None:
+            size = np.linalg.norm(self.pos - _center(self.pos, self.mass), axis=2)
+            self.escape_distance = ESCAPE_FACTOR * size.max(axis=1)
+        else:
+            self.escape_distance = np.full(len(states), float(escape_distance))
+
+        self.members = np.arange(len(states))  # indices of the running members
+        self.state = SystemState(
+            pos=self.pos.copy(),
+            vel=self.vel.copy(),
+            mass=self.mass,
+            density=self.density,
+            color=first.color,
+            fixed=first.fixed,
+        )
+
+    def __len__(self) -> int:
+        return len(self.status)
+
+    @property
+    def running(self) -> int:
+        return len(self.members)
+
+    def step(self, dt: float):
+        """Advance the running members by `dt`."""
+        if not self.running:
+            return
+        self.state = self.integrator(self.state, dt, batched_accelerations)
+        self.steps += 1
+        self.time = self.steps * dt
+        if self.steps % self.check_every == 0:
+            self._terminate()
+
+    def run(self, dt: float, steps: int) -> "Ensemble":
+        """Run `steps` steps, stopping early when every member terminated."""
+        for _ in range(steps):
+            if not self.running:
+                break
+            self.step(dt)
+        return self
+
+    def _terminate(self):
+        state = self.state
+        pos, vel, mass = state.pos, state.vel, state.mass
+        radius = self.radius[self.members]
+
+        r = pos[:, :, None] - pos[:, None, :]
+        distance = np.sqrt(np.einsum("bijk,bijk->bij", r, r))
+        n = mass.shape[1]
+        distance[:, np.arange(n), np.arange(n)] = np.inf
+        touching = distance < radius[:, :, None] + radius[:, None, :]
+        # NaN positions after bodies met at zero distance
+        collided = touching.any(axis=(1, 2)) | ~np.isfinite(pos).all(axis=(1, 2))
+
+        # specific energy of every body with respect to the rest of its member
+        dist = np.linalg.norm(pos - _center(pos, mass), axis=2)
+        relative = vel - _center(vel, mass)
+        rest = mass.sum(axis=1)[:, None] - mass
+        with np.errstate(divide="ignore"):
+            energy = 0.5 * np.einsum("bij,bij->bi", relative, relative)
+            energy -= G * rest / dist
+        escaped = (
+            (dist > self.escape_distance[self.members][:, None]) & (energy > 0)
+        ).any(axis=1) & ~collided
+
+        done = collided | escaped
+        if not done.any():
+            return
+        ended = self.members[done]
+        self.status[ended] = np.where(collided[done], COLLIDED, ESCAPED)
+        self.ended[ended] = self.steps
+        self.pos[ended], self.vel[ended] = pos[done], vel[done]
+
+        keep = ~done
+        self.members = self.members[keep]
+        self.state = SystemState(
+            pos=pos[keep],
+            vel=vel[keep],
+            mass=mass[keep],
+            density=state.density[keep],
+            color=state.color,
+            fixed=state.fixed,
+            acc=None if state.acc is None else state.acc[keep],
+        )
+
+    def sync(self):
+        """Copy the state of the running members into `pos` and `vel`."""
+        self.pos[self.members] = self.state.pos
+        self.vel[self.members] = self.state.vel
+
+    def member(self, i: int) -> SystemState:
+        """Current state of member `i` alone."""
+        self.sync()
+        return SystemState(
+            pos=self.pos[i].copy(),
+            vel=self.vel[i].copy(),
+            mass=self.mass[i],
+            density=self.density[i],
+            color=self.state.color,
+            fixed=self.state.fixed,
+        )
+
+    def drift(self) -> np.ndarray:
+        """(B,) relative energy drift of every member, up to its termination
+        for the terminated ones."""
+        self.sync()
+        energy = batched_energy(self.pos, self.vel, self.mass)
+        return np.abs((energy - self.initial_energy) / self.initial_energy)
+
+    def report(self) -> Dict[str, Any]:
+        """Counts of the members by status and statistics of the energy
+        drift and momentum change over the members."""
+        self.sync()
+        drift = self.drift()
+        momentum = np.linalg.norm(
+            batched_momentum(self.vel, self.mass) - self.initial_momentum, axis=1
+        )
+        return {
+            "members": len(self),
+            "steps": self.steps,
+            "time": self.time,
+            **{
+                name: int(np.sum(self.status == code))
+                for code, name in enumerate(STATUS)
+            },
+            "energy_drift": {
+                "median": float(np.median(drift)),
+                "max": float(drift.max()),
+            },
+            "momentum_change": {
+                "median": float(np.median(momentum)),
+                "max": float(momentum.max()),
+            },
+        }
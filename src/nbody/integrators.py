@@ -0,0 +1,129 @@
+from typing import Dict, Tuple
+
+import numpy as np
+
+from .core import (
+    Accelerations,
+    Integrator,
+    SystemState,
+    direct_accelerations,
+    step,
+)
+from .kepler import kepler, kepler_split
+
+# Coefficients of the 4th order composition of Yoshida (1990).
+YOSHIDA_W1 = 1 / (2 - 2 ** (1 / 3))
+YOSHIDA_W0 = -2 ** (1 / 3) / (2 - 2 ** (1 / 3))
+
+
+def _current_acc(state: SystemState, accelerations: Accelerations) -> np.ndarray:
+    """Accelerations at the current positions, reused from the previous step
+    when available."""
+    if state.acc is not None:
+        return state.acc
+    return accelerations(state.pos, state.mass)
+
+
+def _kick_drift_kick(
+    pos: np.ndarray,
+    vel: np.ndarray,
+    acc: np.ndarray,
+    h: float,
+    accelerations: Accelerations,
+    mass: np.ndarray,
+    moving: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """One leapfrog substep of length `h`, costing one force evaluation."""
+    vel = np.where(moving, vel + acc * (h / 2), vel)
+    pos = np.where(moving, pos + vel * h, pos)
+    acc = accelerations(pos, mass)
+    vel = np.where(moving, vel + acc * (h / 2), vel)
+    return pos, vel, acc
+
+
+def euler(
+    state: SystemState,
+    dt: float,
+    accelerations: Accelerations = direct_accelerations,
+) -> SystemState:
+    """Semi-implicit Euler step of the original scenarios, 1st order."""
+    return step(state, dt, accelerations)
+
+
+def leapfrog(
+    state: SystemState,
+    dt: float,
+    accelerations: Accelerations = direct_accelerations,
+) -> SystemState:
+    """Kick-drift-kick leapfrog step, 2nd order and symplectic.
+
+    The accelerations at the end of the step are kept in the new state and
+    reused by the first kick of the next step, hence one force evaluation per
+    step.
+    """
+    moving = ~state.fixed[:, None]
+    acc = _current_acc(state, accelerations)
+    pos, vel, acc = _kick_drift_kick(
+        state.pos, state.vel, acc, dt, accelerations, state.mass, moving
+    )
+    return state.replace(pos, vel, acc)
+
+
+def velocity_verlet(
+    state: SystemState,
+    dt: float,
+    accelerations: Accelerations = direct_accelerations,
+) -> SystemState:
+    """Velocity Verlet step, 2nd order and symplectic, one force evaluation
+    per step.
+
+    This is the same scheme as `leapfrog` written with a Taylor expansion of
+    the positions and a trapezoidal rule on the velocities.
+    """
+    moving = ~state.fixed[:, None]
+    acc = _current_acc(state, accelerations)
+    pos = np.where(moving, state.pos + state.vel * dt + acc * (dt ** 2 / 2), state.pos)
+    new_acc = accelerations(pos, state.mass)
+    vel = np.where(moving, state.vel + (acc + new_acc) * (dt / 2), state.vel)
+    return state.replace(pos, vel, new_acc)
+
+
+def yoshida4(
+    state: SystemState,
+    dt: float,
+    accelerations: Accelerations = direct_accelerations,
+) -> SystemState:
+    """4th order symplectic step of Yoshida, made of three leapfrog substeps.
+
+    Each substep reuses the accelerations of the previous one, so a step costs
+    three force evaluations, the minimum for this scheme.
+    """
+    moving = ~state.fixed[:, None]
+    pos, vel = state.pos, state.vel
+    acc = _current_acc(state, accelerations)
+    for w in (YOSHIDA_W1, YOSHIDA_W0, YOSHIDA_W1):
+        pos, vel, acc = _kick_drift_kick(
+            pos, vel, acc, w * dt, accelerations, state.mass, moving
+        )
+    return state.replace(pos, vel, acc)
+
+
+INTEGRATORS: Dict[str, Integrator] = {
+    "euler": euler,
+    "leapfrog": leapfrog,
+    "velocity_verlet": velocity_verlet,
+    "yoshida4": yoshida4,
+    "kepler": kepler,
+    "kepler_split": kepler_split,
+}
+
+
+def get_integrator(name: str) -> Integrator:
+    """Look an integrator up by name, one of the keys of `INTEGRATORS`."""
+    try:
+        return INTEGRATORS[name]
+    except KeyError:
+        raise ValueError(
+            f"unknown integrator '{name}', expected one of "
+            f"{', '.join(INTEGRATORS)}"
+        ) from None
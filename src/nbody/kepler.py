@@ -0,0 +1,224 @@
+"""
+Analytic two-body motion with universal variables, valid for elliptic,
+parabolic and hyperbolic orbits, in O(1) whatever the time step:
+
+    state = load_scenario("sun_earth").initial_state()
+    later = kepler_drift(state, 3.15e7)  # one year later, in one call
+
+`kepler_drift` moves every body on its Kepler orbit around the central body,
+exactly when the central body is pinned or when there are only two bodies.
+The `kepler` integrator only uses it and `kepler_split` uses it as the
+unperturbed part of a Wisdom-Holman splitting, where the interactions between
+the other bodies are applied as kicks, for weakly perturbed systems like
+planets around a star.
+"""
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+from .core import G, Accelerations, SystemState, direct_accelerations
+
+MAX_ITERATIONS = 50  # Iterations of the solver of the universal Kepler equation.
+TOLERANCE = 1e-15  # Relative change of the universal anomaly to stop iterating.
+SERIES = 0.1  # Below this |z| the Stumpff functions use their series.
+
+
+def stumpff(z: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """The Stumpff functions C(z) and S(z), for any sign of `z`."""
+    z = np.asarray(z, dtype=float)
+    c, s = np.empty_like(z), np.empty_like(z)
+
+    elliptic = z > SERIES
+    root = np.sqrt(z[elliptic])
+    c[elliptic] = 2 * np.sin(root / 2) ** 2 / z[elliptic]
+    s[elliptic] = (root - np.sin(root)) / root ** 3
+
+    hyperbolic = z < -SERIES
+    root = np.sqrt(-z[hyperbolic])
+    c[hyperbolic] = 2 * np.sinh(root / 2) ** 2 / -z[hyperbolic]
+    s[hyperbolic] = (np.sinh(root) - root) / root ** 3
+
+    # sum of (-z)^k / (2k + 2)! and (-z)^k / (2k + 3)!
+    near = ~(elliptic | hyperbolic)
+    x = -z[near]
+    c_term, s_term = np.full_like(x, 1 / 2), np.full_like(x, 1 / 6)
+    c[near], s[near] = c_term, s_term
+    for k in range(1, 7):
+        c_term = c_term * x / ((2 * k + 1) * (2 * k + 2))
+        s_term = s_term * x / ((2 * k + 2) * (2 * k + 3))
+        c[near] += c_term
+        s[near] += s_term
+    return c, s
+
+
+def propagate(
+    pos: np.ndarray,
+    vel: np.ndarray,
+    mu: Union[float, np.ndarray],
+    dt: Union[float, np.ndarray],
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Advance bodies on Kepler orbits by `dt`.
+
+    The universal Kepler equation is solved for every body at once with the
+    Laguerre-Conway iteration, which converges for any orbit and time step.
+    Elliptic orbits are first brought back to less than one period.
+
+    Args:
+        pos: (M, 3) positions relative to the attracting center.
+        vel: (M, 3) velocities relative to the attracting center.
+        mu: gravitational parameter G (m1 + m2) of every orbit.
+        dt: time step, the same for all the bodies or one per body.
+
+    Returns:
+        the positions and velocities after `dt`.
+    """
+    pos, vel = np.asarray(pos, dtype=float), np.asarray(vel, dtype=float)
+    r0 = np.sqrt(np.einsum("ij,ij->i", pos, pos))
+    mu = np.broadcast_to(np.asarray(mu, dtype=float), r0.shape)
+    t = np.broadcast_to(np.asarray(dt, dtype=float), r0.shape).copy()
+    sqrt_mu = np.sqrt(mu)
+    alpha = 2 / r0 - np.einsum("ij,ij->i", vel, vel) / mu  # inverse semi-major axis
+
+    elliptic = alpha > 0
+    period = 2 * np.pi / np.sqrt(mu[elliptic] * alpha[elliptic] ** 3)
+    t[elliptic] = np.fmod(t[elliptic], period)
+
+    rv = np.einsum("ij,ij->i", pos, vel)
+    a = rv / sqrt_mu
+    b = 1 - alpha * r0
+
+    # initial guess of the universal anomaly, from Vallado for hyperbolic
+    # orbits where too large a guess overflows the Stumpff functions
+    chi = sqrt_mu * np.abs(alpha) * t
+    hyperbolic = alpha < 0
+    sma, sign = 1 / alpha[hyperbolic], np.sign(t[hyperbolic])
+    ratio = -2 * mu[hyperbolic] * alpha[hyperbolic] * t[hyperbolic] / (
+        rv[hyperbolic] + sign * np.sqrt(-mu[hyperbolic] * sma) * b[hyperbolic]
+    )
+    with np.errstate(divide="ignore", invalid="ignore"):
+        guess = sign * np.sqrt(-sma) * np.log(ratio)
+    chi[hyperbolic] = np.where(ratio > 0, guess, chi[hyperbolic])
+    n = 5  # order of the Laguerre-Conway iteration
+    for _ in range(MAX_ITERATIONS):
+        z = alpha * chi ** 2
+        c, s = stumpff(z)
+        f = a * chi ** 2 * c + b * chi ** 3 * s + r0 * chi - sqrt_mu * t
+        df = a * chi * (1 - z * s) + b * chi ** 2 * c + r0
+        ddf = a * (1 - z * c) + b * chi * (1 - z * s)
+        root = np.sqrt(np.abs((n - 1) ** 2 * df ** 2 - n * (n - 1) * f * ddf))
+        delta = n * f / (df + np.copysign(root, df))
+        chi = chi - delta
+        if np.all(np.abs(delta) <= TOLERANCE * np.abs(chi)):
+            break
+
+    z = alpha * chi ** 2
+    c, s = stumpff(z)
+    f = 1 - chi ** 2 / r0 * c
+    g = t - chi ** 3 / sqrt_mu * s
+    new_pos = f[:, None] * pos + g[:, None] * vel
+    r = np.sqrt(np.einsum("ij,ij->i", new_pos, new_pos))
+    df = sqrt_mu / (r * r0) * (z * s - 1) * chi
+    dg = 1 - chi ** 2 / r * c
+    return new_pos, df[:, None] * pos + dg[:, None] * vel
+
+
+def central_body(state: SystemState) -> Optional[int]:
+    """Index of the body the others orbit: the most massive pinned body, or
+    the most massive body when none is pinned, None for two free bodies."""
+    if state.fixed.any():
+        pinned = np.flatnonzero(state.fixed)
+        return int(pinned[np.argmax(state.mass[pinned])])
+    if len(state) == 2:
+        return None
+    return int(np.argmax(state.mass))
+
+
+def kepler_drift(state: SystemState, dt: float) -> SystemState:
+    """Move every body on its Kepler orbit around the central body, see
+    `central_body`, ignoring the interactions between the other bodies.
+
+    Around a pinned body and for two free bodies this is the exact motion, for
+    any `dt`. Otherwise the motion is split in democratic heliocentric
+    coordinates, as in the Wisdom-Holman scheme of Duncan, Levison and Lee
+    (1998): Kepler orbits of the positions relative to the central body with
+    the barycentric velocities, and half drifts of the central body before
+    and after them, so only small steps are accurate.
+    """
+    pos, vel, mass = state.pos.copy(), state.vel.copy(), state.mass
+    center = central_body(state)
+
+    if center is None:  # two free bodies, relative orbit and center of mass
+        total = mass.sum()
+        com = mass @ pos / total
+        com_vel = mass @ vel / total
+        relative, relative_vel = propagate(
+            pos[1:] - pos[:1], vel[1:] - vel[:1], G * total, dt
+        )
+        # the bodies are at -m2 / M and m1 / M of the separation from the
+        # center of mass
+        weights = np.array([[-mass[1]], [mass[0]]]) / total
+        return state.replace(
+            com + com_vel * dt + weights * relative, com_vel + weights * relative_vel
+        )
+
+    others = np.arange(len(mass)) != center
+    mu = G * mass[center]
+    if state.fixed[center]:
+        moving = others & ~state.fixed
+        pos[moving], vel[moving] = propagate(
+            pos[moving] - pos[center], vel[moving], mu, dt
+        )
+        pos[moving] += pos[center]
+        return state.replace(pos, vel)
+
+    total = mass.sum()
+    com = mass @ pos / total
+    com_vel = mass @ vel / total
+    heliocentric = pos[others] - pos[center]
+    barycentric_vel = vel[others] - com_vel
+    # the central body moves with the opposite of the momentum of the others
+    heliocentric += mass[others] @ barycentric_vel / mass[center] * (dt / 2)
+    heliocentric, barycentric_vel = propagate(heliocentric, barycentric_vel, mu, dt)
+    heliocentric += mass[others] @ barycentric_vel / mass[center] * (dt / 2)
+
+    pos[center] = com + com_vel * dt - mass[others] @ heliocentric / total
+    pos[others] = heliocentric + pos[center]
+    vel[others] = barycentric_vel + com_vel
+    vel[center] = com_vel - mass[others] @ barycentric_vel / mass[center]
+    return state.replace(pos, vel)
+
+
+def kepler(
+    state: SystemState,
+    dt: float,
+    accelerations: Accelerations = direct_accelerations,
+) -> SystemState:
+    """Unperturbed Kepler motion only, `accelerations` is not used. Exact for a
+    body around a pinned one or for two bodies, e.g. the `sun_earth`
+    scenario."""
+    return kepler_drift(state, dt)
+
+
+def kepler_split(
+    state: SystemState,
+    dt: float,
+    accelerations: Accelerations = direct_accelerations,
+) -> SystemState:
+    """Wisdom-Holman step, 2nd order and symplectic: half a Kepler drift, a
+    kick from the interactions between the bodies other than the central
+    one, and another half drift, one force evaluation per step.
+
+    The error is proportional to the perturbations rather than to the
+    central force, so much larger steps than with `leapfrog` are accurate
+    for planetary systems.
+    """
+    state = kepler_drift(state, dt / 2)
+    center = central_body(state)
+    if center is not None:
+        others = np.flatnonzero(np.arange(len(state)) != center)
+        kicked = others[~state.fixed[others]]
+        acc = accelerations(state.pos[others], state.mass[others])
+        vel = state.vel.copy()
+        vel[kicked] += acc[~state.fixed[others]] * dt
+        state = state.replace(state.pos, vel)
+    return kepler_drift(state, dt / 2)
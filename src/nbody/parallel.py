@@ -0,0 +1,116 @@
+from typing import Dict, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import os
+
+import numpy as np
+
+from .core import direct_accelerations
+
+# Shared buffers attached by a worker process, by name of the shared block.
+_attached: Dict[str, Tuple[shared_memory.SharedMemory, np.ndarray]] = {}
+
+
+def _attach(name: str, shape: Tuple[int, ...]) -> np.ndarray:
+    """Map a shared block in the current worker, once per block."""
+    if name not in _attached:
+        block = shared_memory.SharedMemory(name=name)
+        _attached[name] = (block, np.ndarray(shape, dtype=float, buffer=block.buf))
+    return _attached[name][1]
+
+
+def _detach(keep: List[str]):
+    for name in [name for name in _attached if name not in keep]:
+        block, _ = _attached.pop(name)
+        block.close()
+
+
+def _accelerations_task(
+    names: Tuple[str, str, str],
+    n: int,
+    start: int,
+    stop: int,
+    eps: float = 0.0,
+) -> None:
+    """Compute the accelerations of the bodies `start` to `stop` from the
+    shared positions and masses, and write them to the shared output."""
+    _detach(list(names))
+    pos = _attach(names[0], (n, 3))
+    mass = _attach(names[1], (n,))
+    acc = _attach(names[2], (n, 3))
+    acc[start:stop] = direct_accelerations(pos, mass, np.arange(start, stop), eps=eps)
+
+
+class ParallelAccelerations:
+    """Direct-sum force backend running on a pool of processes.
+
+    Positions and masses are copied into shared memory once per call and the
+    target bodies are split into one contiguous slice per worker, which writes
+    its accelerations straight into a shared output buffer: nothing but the
+    names of the buffers and the bounds of the slices is sent to the workers.
+
+    Every acceleration is computed by a single worker with the same summation
+    order as `nbody.direct_accelerations`, so there is no reduction across
+    workers and the results are bit-identical to the serial kernel whatever
+    the number of workers.
+
+    To be given to `nbody.make_update`, and closed when done, e.g. with a
+    `with` block. `eps` is the Plummer softening length of the forces.
+    """
+
+    def __init__(self, workers: Optional[int] = None, eps: float = 0.0):
+        self.workers = workers or os.cpu_count() or 1
+        self.eps = eps
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._blocks: List[shared_memory.SharedMemory] = []
+        self._arrays: List[np.ndarray] = []
+        self._n = -1
+
+    def _allocate(self, n: int):
+        self._release()
+        for shape in ((n, 3), (n,), (n, 3)):
+            block = shared_memory.SharedMemory(
+                create=True, size=max(int(np.prod(shape)), 1) * 8
+            )
+            self._blocks.append(block)
+            self._arrays.append(np.ndarray(shape, dtype=float, buffer=block.buf))
+        self._n = n
+
+    def _release(self):
+        self._arrays = []
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+        self._blocks = []
+        self._n = -1
+
+    def __call__(self, pos: np.ndarray, mass: np.ndarray) -> np.ndarray:
+        n = len(mass)
+        if n != self._n:
+            self._allocate(n)
+        shared_pos, shared_mass, shared_acc = self._arrays
+        shared_pos[:] = pos
+        shared_mass[:] = mass
+
+        names = tuple(block.name for block in self._blocks)
+        bounds = np.linspace(0, n, self.workers + 1).astype(int)
+        tasks = [
+            self._executor.submit(
+                _accelerations_task, names, n, int(start), int(stop), self.eps
+            )
+            for start, stop in zip(bounds[:-1], bounds[1:])
+            if stop > start
+        ]
+        for task in tasks:
+            task.result()
+        return shared_acc.copy()
+
+    def close(self):
+        self._executor.shutdown()
+        self._release()
+
+    def __enter__(self) -> "ParallelAccelerations":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
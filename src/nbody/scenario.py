@@ -0,0 +1,242 @@
+"""
+Scenarios described by JSON files, see the `scenarios` directory.
+
+A scenario gives the time step, the view and the list of bodies. Every body
+has a mass, a density and a color, and is placed either explicitly:
+
+    {"name": "Sun", "mass": 1.9885e30, "density": 1.408, "color": [255, 255, 0],
+     "pos": [0, 0, 0], "vel": [0, 0, 0], "pinned": true}
+
+or on an orbit around a body listed before it, starting at its perihelion
+on the x axis and moving along y, circular when there is no aphelion:
+
+    {"name": "Earth", ..., "orbit": {"around": "Sun", "perihelion": 0.983,
+                                     "aphelion": 1.017}}
+
+Positions and orbit distances are in `distance_unit` (m, km or AU),
+velocities in m/s and masses in kg.
+"""
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from dataclasses import dataclass, field
+import json
+import os
+
+from vec3 import Vector3d
+
+from .core import G, BodyView, SystemState, direct_accelerations, make_update, step
+
+AU = 14959787070  # Astronomical unit in meters (scaled value).
+UNITS = {"m": 1, "km": 1e3, "AU": AU}
+
+SCENARIO_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scenarios"
+)
+
+
+@dataclass
+class Scenario:
+    name: str
+    dt: float
+    bodies: List[Dict[str, Any]]
+    distance_unit: str = "m"
+    # a name of `integrators.INTEGRATORS`, or "block_hermite" for `BlockTimestepper`
+    integrator: str = "euler"
+    # opening angle of the Barnes-Hut backend, direct summation when None
+    theta: Optional[float] = None
+    # merge the bodies that touch, see `collisions`
+    collisions: bool = False
+
+    caption: str = "My Simulation"
+    zoom: float = 1e-6
+    center: Tuple[float, float] = (0, 0)
+    trail_length: int = 500
+    description: str = field(default="", repr=False)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Scenario":
+        try:
+            scenario = cls(**data)
+        except TypeError as e:
+            raise ValueError(f"invalid scenario '{data.get('name')}': {e}") from e
+        if scenario.distance_unit not in UNITS:
+            raise ValueError(
+                f"unknown distance unit '{scenario.distance_unit}', "
+                f"expected one of {', '.join(UNITS)}"
+            )
+        return scenario
+
+    def initial_state(self) -> SystemState:
+        """Build the bodies of the scenario."""
+        scale = UNITS[self.distance_unit]
+        bodies: List[BodyView] = []
+        by_name: Dict[str, BodyView] = {}
+        for spec in self.bodies:
+            if "orbit" in spec:
+                pos, vel = self._orbit(spec["orbit"], by_name, scale)
+            else:
+                pos, vel = Vector3d(*spec["pos"]) * scale, Vector3d(*spec["vel"])
+            b = BodyView(
+                pos, vel, spec["mass"], spec["density"], tuple(spec["color"])
+            )
+            bodies.append(b)
+            if "name" in spec:
+                by_name[spec["name"]] = b
+
+        return SystemState.from_bodies(
+            bodies, fixed=[spec.get("pinned", False) for spec in self.bodies]
+        )
+
+    def _orbit(
+        self,
+        orbit: Dict[str, Any],
+        by_name: Dict[str, BodyView],
+        scale: float,
+    ) -> Tuple[Vector3d, Vector3d]:
+        if orbit["around"] not in by_name:
+            raise ValueError(
+                f"unknown body '{orbit['around']}' in scenario '{self.name}', "
+                "orbits must be around a body listed before"
+            )
+        center = by_name[orbit["around"]]
+        perihelion = orbit["perihelion"] * scale
+        if "aphelion" in orbit:
+            semi_major_axis = (perihelion + orbit["aphelion"] * scale) / 2
+            speed = (G * center.mass * (2 / perihelion - 1 / semi_major_axis)) ** 0.5
+        else:
+            speed = (G * center.mass / perihelion) ** 0.5
+        return (
+            center.pos + Vector3d(perihelion, 0, 0),
+            center.vel + Vector3d(0, speed, 0),
+        )
+
+    def make_update(self) -> Callable[[SystemState, float], SystemState]:
+        """Update callback with the force backend and the integrator of the
+        scenario."""
+        from .integrators import get_integrator
+
+        if self.integrator == "block_hermite":
+            if self.theta is not None:
+                raise ValueError(
+                    "the block_hermite integrator sums the forces directly, "
+                    "it cannot be used with theta"
+                )
+            from .block_timestep import BlockTimestepper
+
+            update = BlockTimestepper()
+        else:
+            if self.theta is None:
+                accelerations = direct_accelerations
+            else:
+                from .barnes_hut import BarnesHut
+
+                accelerations = BarnesHut(self.theta)
+            update = make_update(accelerations, get_integrator(self.integrator))
+        if self.collisions:
+            from .collisions import Collisions
+
+            update = Collisions(update)
+        return update
+
+    def simulation(self, **options):
+        """Window showing the scenario, `options` are given to
+        `ui.Simulation`."""
+        from ui import Simulation  # imported here, pygame is only needed to render
+
+        options.setdefault("trail_length", self.trail_length)
+        simulation = Simulation(
+            frame_rate=30,
+            width=800,
+            height=800,
+            caption=self.caption,
+            dt=self.dt,
+            **options,
+        )
+        simulation.setup()
+        simulation.center = tuple(self.center)
+        simulation.zoom = self.zoom
+        return simulation
+
+    def run_window(
+        self,
+        initial_state: Optional[Callable[[], SystemState]] = None,
+        probe: Optional[str] = None,
+        every: int = 10,
+        plot: bool = True,
+        **options,
+    ):
+        """Run the scenario in a window, as the `sim_*.py` scripts do.
+
+        The named bodies are printed first and, for the body named `probe`,
+        the force the others exert on it and its state after one Euler step
+        of 1 hour. The update of the scenario is sampled by `Diagnostics`
+        every `every` steps, like the headless runs, and once the window is
+        closed the energy report is printed and the energy history plotted.
+
+        Args:
+            initial_state: builder of the initial state, `initial_state` of
+                the scenario by default, e.g. to add test particles.
+            probe: optional name of a body to print the first step of.
+            every: steps between two energy samples.
+            plot: plot the energy history with matplotlib.
+            options: given to `simulation`.
+
+        Returns:
+            the `Diagnostics` of the run.
+        """
+        from .diagnostics import Diagnostics
+
+        state = (initial_state or self.initial_state)()
+        names = [spec.get("name") for spec in self.bodies]
+        for name, b in zip(names, state):
+            if name is not None:
+                print(f"{name}:", b)
+        if probe is not None:
+            if probe not in names:
+                raise ValueError(f"unknown body '{probe}' in scenario '{self.name}'")
+            i = names.index(probe)
+            acceleration = direct_accelerations(state.pos, state.mass)[i]
+            force = Vector3d(*acceleration.tolist()) * state[i].mass
+            print(f"\nGravitational force exerted on {probe}:", force)
+            print(
+                f"\nUpdated {probe} position and velocity after 1 hour:",
+                step(state, 60 * 60)[i],
+            )
+
+        diagnostics = Diagnostics(every=every)
+        simulation = self.simulation(**options)
+        simulation.loop(initial_state=state, update=diagnostics.wrap(self.make_update()))
+        print("Energy diagnostics:", diagnostics.report())
+
+        if plot:
+            import matplotlib.pyplot as plt  # only needed for the plot
+
+            steps, energy_values = diagnostics.energies()
+            plt.plot(steps, energy_values)
+            plt.xlabel("Time Step")
+            plt.ylabel("Total Energy")
+            plt.title(f"Energy Stability over Time with {self.integrator} Integration")
+            plt.show()
+        return diagnostics
+
+
+def scenario_path(name: str) -> str:
+    """Path of a scenario file, from a path or from the name of a file of the
+    `scenarios` directory."""
+    if name.endswith(".json"):
+        return name
+    return os.path.join(SCENARIO_DIR, name + ".json")
+
+
+def list_scenarios() -> List[str]:
+    return sorted(
+        name[:-5] for name in os.listdir(SCENARIO_DIR) if name.endswith(".json")
+    )
+
+
+def load_scenario(name: str) -> Scenario:
+    """Load a scenario from a JSON file, see `scenario_path`."""
+    path = scenario_path(name)
+    with open(path) as f:
+        data = json.load(f)
+    data.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+    return Scenario.from_dict(data)
@@ -0,0 +1,207 @@
+"""
+Binary trajectory files, written while the simulation runs and read back with
+`numpy.memmap`.
+
+A file is a header of `HEADER_SIZE` bytes followed by fixed size frames:
+
+    magic  b"NBTRAJ1\\n"
+    length of the JSON description, uint32
+    JSON description: number of bodies, masses, densities, colors, units, dt,
+        number of steps between two frames and the NumPy dtype of a frame
+    zero padding up to HEADER_SIZE
+    frames: step (int64), time (float64), pos (N, 3) and vel (N, 3) (float64)
+
+The frame count is not stored but derived from the file size, so frames are
+simply appended and a file cut short by a crash is still readable up to its
+last complete frame.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import json
+import os
+import struct
+
+import numpy as np
+
+from vec3 import Vec3Array
+
+MAGIC = b"NBTRAJ1\n"
+HEADER_SIZE = 4096  # keeps the frames page aligned
+CHUNK_FRAMES = 256  # frames buffered in memory before being written
+
+UNITS = {"length": "m", "velocity": "m/s", "time": "s", "mass": "kg"}
+
+
+def frame_dtype(n: int) -> np.dtype:
+    return np.dtype([
+        ("step", "<i8"),
+        ("time", "<f8"),
+        ("pos", "<f8", (n, 3)),
+        ("vel", "<f8", (n, 3)),
+    ])
+
+
+def state_arrays(state: Any) -> Tuple[np.ndarray, np.ndarray]:
+    """Positions and velocities of a `SystemState` or of a list of bodies, as
+    (N, 3) arrays."""
+    pos = getattr(state, "pos", None)
+    if isinstance(pos, np.ndarray):
+        return state.pos, state.vel
+    pos = Vec3Array.from_vectors(b.pos for b in state)
+    vel = Vec3Array.from_vectors(b.vel for b in state)
+    return pos.data, vel.data
+
+
+class TrajectoryWriter:
+    """Append the positions and velocities of the bodies to a trajectory file
+    every `every` steps.
+
+    Frames are buffered in a chunk of `chunk_frames` frames which is written
+    to the file when full, so memory use does not depend on the length of the
+    run. The header is written with the first frame, from the bodies of that
+    state. Called like the sinks of `headless.run`, with `(step, time, state)`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        dt: float,
+        every: int = 1,
+        chunk_frames: int = CHUNK_FRAMES,
+        units: Optional[Dict[str, str]] = None,
+    ):
+        self.path = path
+        self.dt = dt
+        self.every = every
+        self.chunk_frames = chunk_frames
+        self.units = units or UNITS
+        self.frames = 0
+
+        self._file = open(path, "wb")
+        self._chunk: Optional[np.ndarray] = None
+        self._buffered = 0
+
+    def _write_header(self, state: Any):
+        header = {
+            "n": len(state),
+            "dt": self.dt,
+            "every": self.every,
+            "units": self.units,
+            "mass": [float(b.mass) for b in state],
+            "density": [float(b.density) for b in state],
+            "color": [[int(c) for c in b.color] for b in state],
+            "dtype": frame_dtype(len(state)).descr,
+        }
+        description = json.dumps(header).encode()
+        size = len(MAGIC) + 4 + len(description)
+        if size > HEADER_SIZE:
+            # too many bodies for the default header, round up to whole pages
+            header_size = -(-size // HEADER_SIZE) * HEADER_SIZE
+        else:
+            header_size = HEADER_SIZE
+        self._file.write(MAGIC + struct.pack("<I", len(description)) + description)
+        self._file.write(b"\0" * (header_size - size))
+        self._chunk = np.zeros(self.chunk_frames, dtype=frame_dtype(len(state)))
+
+    def __call__(self, step: int, t: float, state: Any):
+        if step % self.every:
+            return
+        if self._chunk is None:
+            self._write_header(state)
+        elif len(state) != self._chunk.dtype["pos"].shape[0]:
+            raise ValueError(
+                f"trajectory files have a fixed number of bodies, got {len(state)} "
+                f"bodies instead of {self._chunk.dtype['pos'].shape[0]}, e.g. after "
+                "collisions, use a CSV file"
+            )
+
+        frame = self._chunk[self._buffered]
+        frame["step"] = step
+        frame["time"] = t
+        frame["pos"], frame["vel"] = state_arrays(state)
+        self._buffered += 1
+        self.frames += 1
+        if self._buffered == self.chunk_frames:
+            self.flush()
+
+    def flush(self):
+        if self._buffered:
+            self._file.write(self._chunk[:self._buffered].tobytes())
+            self._buffered = 0
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+    def __enter__(self) -> "TrajectoryWriter":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Trajectory:
+    """Trajectory file mapped in memory.
+
+    `pos` and `vel` are (frames, N, 3) views of the file, nothing is read
+    until they are indexed: `traj.pos[100]` reads a single frame and
+    `traj.pos[:, 3]` the trajectory of a single body.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"'{path}' is not a trajectory file")
+            (length,) = struct.unpack("<I", f.read(4))
+            self.header: Dict[str, Any] = json.loads(f.read(length))
+
+        size = len(MAGIC) + 4 + length
+        offset = -(-size // HEADER_SIZE) * HEADER_SIZE
+        dtype = np.dtype([tuple(field) for field in self.header["dtype"]])
+        count = (os.path.getsize(path) - offset) // dtype.itemsize
+        if count > 0:
+            self.frames = np.memmap(
+                path, dtype=dtype, mode="r", offset=offset, shape=(count,)
+            )
+        else:
+            self.frames = np.zeros(0, dtype=dtype)
+
+    def __len__(self) -> int:
+        return len(self.frames)
+
+    @property
+    def n(self) -> int:
+        return self.header["n"]
+
+    @property
+    def dt(self) -> float:
+        return self.header["dt"]
+
+    @property
+    def mass(self) -> np.ndarray:
+        return np.array(self.header["mass"])
+
+    @property
+    def color(self) -> List[Tuple[int, int, int]]:
+        return [tuple(c) for c in self.header["color"]]
+
+    @property
+    def step(self) -> np.ndarray:
+        return self.frames["step"]
+
+    @property
+    def time(self) -> np.ndarray:
+        return self.frames["time"]
+
+    @property
+    def pos(self) -> np.ndarray:
+        return self.frames["pos"]
+
+    @property
+    def vel(self) -> np.ndarray:
+        return self.frames["vel"]
+
+    def at_time(self, t: float) -> int:
+        """Index of the last frame at or before time `t`."""
+        return max(int(np.searchsorted(self.time, t, side="right")) - 1, 0)
@@ -1,4 +1,9 @@
+import heapq
 import json
+import os
+import tempfile
+
+import numpy as np
 
 # Class to represent a Near-Earth Object with attributes name, diameter, and hazard status.
 class NearEarthObject:
@@ -16,28 +21,547 @@ class NearEarthObject:
         # Compare two NearEarthObject instances based on their diameter.
         return self.diameter < higher.diameter
 
+
+CHUNK_SIZE = 1 << 16  # Characters read at a time by the streaming parser.
+TABLE_CAPACITY = 1024  # Initial number of rows of a table, doubled when full.
+CACHE_SUFFIX = ".cache"  # Appended to the path of a feed to name its binary sidecar file.
+CACHE_FORMAT = 2  # Version of the layout and of the aggregates of the sidecar files.
+CACHE_ALIGNMENT = 64  # Alignment in bytes of the columns in the sidecar files.
+
+
+# Buffered reader decoding a JSON document one value at a time, so that only the
+# value being decoded and one chunk of the file are held in memory.
+class JsonStream:
+    def __init__(self, infile, chunk_size=CHUNK_SIZE):
+        self.file = infile
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0  # Position of the next character to decode in the buffer.
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self):
+        # Append the next chunk of the file to the unread part of the buffer,
+        # return False at the end of the file.
+        chunk = self.file.read(self.chunk_size)
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return bool(chunk)
+
+    def peek(self):
+        # Return the next character that is not whitespace, "" at the end of the file.
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char):
+        # Consume `char`, which must be the next character that is not whitespace.
+        if self.peek() != char:
+            raise ValueError(f"Invalid JSON: expected '{char}', got '{self.peek()}'")
+        self.pos += 1
+
+    def skip(self, char):
+        # Consume `char` if it is the next character that is not whitespace.
+        if self.peek() == char:
+            self.pos += 1
+
+    def value(self):
+        # Decode the next JSON value, reading more of the file until it is complete.
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number at the end of the buffer may go on in the next chunk.
+            if end < len(self.buffer) or not self._fill():
+                self.pos = end
+                return value
+
+
+# Function to build a NearEarthObject from one entry of the feed, None when data is missing.
+def parse_neo(neo_data):
+    name = neo_data.get("name")
+    diameter = neo_data.get("estimated_diameter", {}).get("meters", {}).get("estimated_diameter_max")
+    is_potentially_hazardous = neo_data.get("is_potentially_hazardous_asteroid", False)
+
+    if name and diameter is not None:
+        return NearEarthObject(name, diameter, is_potentially_hazardous)
+    print(f"Missing data: {neo_data}")
+    return None
+
+
+# Generator yielding the (date, entry) pairs of a NeoWs feed file date by date, the
+# entries being the raw dictionaries of the feed. The file is parsed incrementally,
+# one object at a time, so the memory used does not depend on the size of the file
+# and the first objects come out right away.
+def iter_records(file):
+    with open(file) as infile:
+        stream = JsonStream(infile)
+        stream.expect("{")
+        while stream.peek() != "}":
+            key = stream.value()
+            stream.expect(":")
+            if key != "near_earth_objects":
+                stream.value()  # Skip the other fields, e.g. "links" and "element_count".
+            else:
+                stream.expect("{")
+                while stream.peek() != "}":
+                    date = stream.value()  # Date of the objects that follow.
+                    stream.expect(":")
+                    stream.expect("[")
+                    while stream.peek() != "]":
+                        yield date, stream.value()
+                        stream.skip(",")
+                    stream.expect("]")
+                    stream.skip(",")
+                stream.expect("}")
+            stream.skip(",")
+
+
+# Generator yielding the NearEarthObject instances of a NeoWs feed file, see iter_records.
+def iter_json(file):
+    for date, neo_data in iter_records(file):
+        neo = parse_neo(neo_data)
+        if neo is not None:
+            yield neo
+
+
 # Function to read NEO data from a JSON file and return a list of NearEarthObject instances.
 def read_json(file):
-    infile = open(file)  # Open the JSON file.
-    data = json.load(infile)  # Load JSON data from the file.
-    neos = []  # Initialize an empty list to store Near-Earth Object instances.
+    return list(iter_json(file))
+
+# Columns of equal length stored as NumPy arrays, one per field, with room to grow.
+# Subclasses list their columns and types in COLUMNS. A column is read as an
+# attribute, e.g. table.diameter, and indexing a table with a boolean mask, indices
+# or a slice gives a new table of the selected rows.
+class ColumnTable:
+    COLUMNS = {}
+
+    def __init__(self, capacity=TABLE_CAPACITY):
+        self.size = 0
+        self._columns = {name: np.empty(capacity, dtype) for name, dtype in self.COLUMNS.items()}
+        self.indexes = {}  # SortedIndex of the columns queried with index, by column.
+
+    def __len__(self):
+        return self.size
+
+    def __getattr__(self, name):
+        # Columns are views of the filled part of the arrays.
+        columns = self.__dict__.get("_columns")
+        if columns is None or name not in columns:
+            raise AttributeError(name)
+        return columns[name][:self.size]
+
+    def __getitem__(self, rows):
+        # New table with the rows selected by a boolean mask, indices or a slice.
+        table = type(self)(capacity=0)
+        table._append_columns({name: getattr(self, name)[rows] for name in self.COLUMNS})
+        return table
+
+    def __repr__(self):
+        return f"{type(self).__name__}(size={self.size})"
+
+    def index(self, column):
+        # SortedIndex of a column, built on first use and kept up to date afterwards.
+        if column not in self.indexes:
+            self.indexes[column] = SortedIndex(self, column)
+        return self.indexes[column]
+
+    def _append_rows(self, rows):
+        # Convert lists of values to arrays, append them and empty the lists.
+        n = len(next(iter(rows.values())))
+        if n:
+            columns = {}
+            for name, values in rows.items():
+                columns[name] = np.empty(n, dtype=object) if self.COLUMNS[name] is object \
+                    else np.array(values, dtype=self.COLUMNS[name])
+                if self.COLUMNS[name] is object:
+                    columns[name][:] = values
+                values.clear()
+            self._append_columns(columns)
+        return n
+
+    def _append_columns(self, columns):
+        # Append arrays of equal length, doubling the capacity when needed.
+        n = len(next(iter(columns.values())))
+        capacity = len(next(iter(self._columns.values())))
+        if self.size + n > capacity:
+            capacity = max(2 * capacity, self.size + n)
+            for name, column in self._columns.items():
+                grown = np.empty(capacity, self.COLUMNS[name])
+                grown[:self.size] = column[:self.size]
+                self._columns[name] = grown
+        for name, column in self._columns.items():
+            column[self.size:self.size + n] = columns[name]
+        self.size += n
+        self._appended(columns)
+
+    def _appended(self, columns):
+        # Called with the columns of the rows just appended, to update aggregates.
+        pass
+
+
+# Close approaches of NEOs, from the close_approach_data of the feed, with the
+# velocities and distances converted from strings to numbers once.
+class CloseApproaches(ColumnTable):
+    # Columns and their types, missing values are NaN and NaT.
+    COLUMNS = {
+        "neo": np.int64,  # Row of the object in its NeoTable.
+        "epoch": "datetime64[ms]",  # Time of the closest approach, UTC.
+        "velocity": np.float64,  # Relative velocity in km/s.
+        "miss_distance": np.float64,  # Miss distance in km.
+        "orbiting_body": object,
+    }
+
+
+# Columnar storage of NEOs: one NumPy array per field, so that filters are boolean
+# masks over whole columns, e.g. table[(table.diameter >= 400) & table.hazardous],
+# and the aggregates used by NeoAnalyzer are kept up to date as rows are added.
+# The close approaches of the objects are in `approaches`.
+class NeoTable(ColumnTable):
+    # Columns and their types, missing values are NaN for floats and -1 for ids.
+    COLUMNS = {
+        "name": object,
+        "id": np.int64,
+        "diameter_min": np.float64,
+        "diameter": np.float64,  # Estimated maximum diameter in meters, as NearEarthObject.
+        "hazardous": bool,
+        "sentry": bool,
+        "magnitude": np.float64,  # Absolute magnitude H.
+        "date": "datetime64[D]",  # Date of the feed listing the object.
+    }
+
+    def __init__(self, capacity=TABLE_CAPACITY):
+        super().__init__(capacity)
+        # Aggregates maintained incrementally by _appended.
+        self.diameter_sum = 0.0
+        self.hazardous_count = 0
+        self.approaches = CloseApproaches(capacity)
+
+    @classmethod
+    def from_json(cls, file, batch=65536):
+        # Build the table of a NeoWs feed file, streamed and converted `batch` entries at a time.
+        table = cls()
+        table.extend(iter_records(file), batch)
+        return table
+
+    def __getitem__(self, rows):
+        # New table with the selected rows and their close approaches.
+        table = super().__getitem__(rows)
+        new_row = np.full(self.size, -1)
+        new_row[np.arange(self.size)[rows]] = np.arange(len(table))
+        table.approaches = self.approaches[new_row[self.approaches.neo] >= 0]
+        table.approaches.neo[:] = new_row[table.approaches.neo]
+        return table
+
+    def __iter__(self):
+        # Rows as NearEarthObject instances.
+        return iter(self.rows(slice(None)))
 
-    # Iterate over NEOs and create NearEarthObject instances.
-    for date, neo_list in data["near_earth_objects"].items():
-        for neo_data in neo_list:
+    def rows(self, rows):
+        # List of NearEarthObject instances of the rows selected by indices, a mask or a slice.
+        return [
+            NearEarthObject(name, diameter, hazardous)
+            for name, diameter, hazardous in zip(
+                self.name[rows], self.diameter[rows].tolist(), self.hazardous[rows].tolist()
+            )
+        ]
+
+    def extend(self, records, batch=65536):
+        # Add the (date, entry) pairs of `records`, e.g. from iter_records, skipping the
+        # entries with missing data like parse_neo. Returns the number of rows added.
+        added = 0
+        rows = {name: [] for name in self.COLUMNS}
+        approaches = {name: [] for name in CloseApproaches.COLUMNS}
+        for date, neo_data in records:
             name = neo_data.get("name")
-            diameter = neo_data.get("estimated_diameter", {}).get("meters", {}).get("estimated_diameter_max")
-            is_potentially_hazardous = neo_data.get("is_potentially_hazardous_asteroid", False)
+            meters = neo_data.get("estimated_diameter", {}).get("meters", {})
+            diameter = meters.get("estimated_diameter_max")
+            if not name or diameter is None:
+                print(f"Missing data: {neo_data}")
+                continue
+            for approach in neo_data.get("close_approach_data", []):
+                velocity = approach.get("relative_velocity", {}).get("kilometers_per_second")
+                distance = approach.get("miss_distance", {}).get("kilometers")
+                approaches["neo"].append(self.size + len(rows["name"]))
+                approaches["epoch"].append(approach.get("epoch_date_close_approach"))
+                approaches["velocity"].append(np.nan if velocity is None else float(velocity))
+                approaches["miss_distance"].append(np.nan if distance is None else float(distance))
+                approaches["orbiting_body"].append(approach.get("orbiting_body", ""))
+            rows["name"].append(name)
+            rows["id"].append(int(neo_data.get("id", -1)))
+            rows["diameter_min"].append(meters.get("estimated_diameter_min", np.nan))
+            rows["diameter"].append(diameter)
+            rows["hazardous"].append(neo_data.get("is_potentially_hazardous_asteroid", False))
+            rows["sentry"].append(neo_data.get("is_sentry_object", False))
+            rows["magnitude"].append(neo_data.get("absolute_magnitude_h", np.nan))
+            rows["date"].append(date)
+            if len(rows["name"]) == batch:
+                added += self._append_rows(rows)
+                self.approaches._append_rows(approaches)
+        self.approaches._append_rows(approaches)
+        return added + self._append_rows(rows)
+
+    def _appended(self, columns):
+        # Diameters added one after the other in row order, like the sum of the original
+        # analyzer, np.sum adds pairwise and can differ in the last digits.
+        diameters = np.concatenate(([self.diameter_sum], columns["diameter"]))
+        self.diameter_sum = float(np.add.accumulate(diameters)[-1])
+        self.hazardous_count += int(np.count_nonzero(columns["hazardous"]))
+
+    def closest_approaches(self, start, end, k=10, orbiting_body=None):
+        # The k close approaches with the smallest miss distance between the times
+        # `start` and `end`, datetime64 or ISO strings like "2023-10-11T12:00", closest
+        # first, only those to `orbiting_body` if given, e.g. "Earth". Returns a
+        # CloseApproaches table, its neo column gives the rows of the objects.
+        approaches = self.approaches
+        start, end = np.datetime64(start, "ms"), np.datetime64(end, "ms")
+        if "epoch" in approaches.indexes:
+            rows = approaches.indexes["epoch"].range(start, end)
+        else:
+            rows = np.flatnonzero((approaches.epoch >= start) & (approaches.epoch <= end))
+        if orbiting_body is not None:
+            rows = rows[approaches.orbiting_body[rows] == orbiting_body]
+        distance = approaches.miss_distance[rows]
+        if k < len(rows):
+            kept = np.argpartition(distance, k)[:k]
+            rows, distance = rows[kept], distance[kept]
+        return approaches[rows[np.argsort(distance, kind="stable")]]
+
+
+# Function to load the NeoTable of a NeoWs feed file through a binary sidecar file,
+# `file + CACHE_SUFFIX`: the first load parses the JSON and writes the columns to the
+# sidecar, the next ones map the sidecar into memory without parsing anything, until
+# the size or the modification time of `file` change. The parsed table is returned
+# even when the sidecar cannot be written, e.g. in a read-only directory.
+def load_neos(file, cache=True):
+    if not cache:
+        return NeoTable.from_json(file)
+    stat = os.stat(file)
+    source = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    path = file + CACHE_SUFFIX
+    table = _read_cache(path, source)
+    if table is None:
+        table = NeoTable.from_json(file)
+        try:
+            _write_cache(path, source, table)
+        except OSError as e:
+            print(f"Cannot write the cache {path}: {e}")
+    return table
+
+
+def _cache_columns(table):
+    # Columns of a NeoTable and of its approaches to store, strings as fixed width arrays.
+    columns = {}
+    for prefix, part in (("neos", table), ("approaches", table.approaches)):
+        for name in part.COLUMNS:
+            column = getattr(part, name)
+            if column.dtype == object:
+                column = np.array(column.tolist(), dtype=str) if len(column) else np.empty(0, "U1")
+            columns[f"{prefix}.{name}"] = np.ascontiguousarray(column)
+    return columns
+
+
+def _aligned(size):
+    return -(-size // CACHE_ALIGNMENT) * CACHE_ALIGNMENT
 
-            if name and diameter is not None:
-                neos.append(NearEarthObject(name, diameter, is_potentially_hazardous))
+
+def _write_cache(path, source, table):
+    # Write the sidecar: the length of a JSON header, the header, then every column
+    # at an aligned offset. Written to a temporary file of a unique name and renamed,
+    # so that processes loading the same feed at once do not mix their writes.
+    columns = _cache_columns(table)
+    header = {
+        "format": CACHE_FORMAT,
+        "source": source,
+        "diameter_sum": table.diameter_sum,
+        "hazardous_count": table.hazardous_count,
+        "columns": {},
+    }
+    offset = 0
+    for name, column in columns.items():
+        header["columns"][name] = {"dtype": column.dtype.str, "length": len(column), "offset": offset}
+        offset += _aligned(column.nbytes)
+    encoded = json.dumps(header).encode()
+    start = _aligned(8 + len(encoded))
+
+    directory, name = os.path.split(path)
+    f = tempfile.NamedTemporaryFile(dir=directory or ".", prefix=name, suffix=".tmp", delete=False)
+    try:
+        with f:
+            f.write(len(encoded).to_bytes(8, "little"))
+            f.write(encoded)
+            for column_name, column in columns.items():
+                f.seek(start + header["columns"][column_name]["offset"])
+                column.tofile(f)
+            f.truncate(start + offset)
+        os.replace(f.name, path)
+    except BaseException:
+        os.remove(f.name)
+        raise
+
+
+def _read_cache(path, source):
+    # NeoTable of read-only memory maps of the columns of the sidecar, None when there
+    # is no sidecar, when it does not match `source` or when it is truncated.
+    try:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            length = int.from_bytes(f.read(8), "little")
+            header = json.loads(f.read(length))
+    except (OSError, ValueError):
+        return None
+    if header.get("format") != CACHE_FORMAT or header.get("source") != source:
+        return None
+    start = _aligned(8 + length)
+    # A column past the end of the file would make np.memmap fail on every load,
+    # the feed is parsed again and the sidecar rewritten instead.
+    for spec in header["columns"].values():
+        if start + spec["offset"] + spec["length"] * np.dtype(spec["dtype"]).itemsize > size:
+            return None
+
+    table = NeoTable(capacity=0)
+    for prefix, part in (("neos", table), ("approaches", table.approaches)):
+        for name in part.COLUMNS:
+            spec = header["columns"][f"{prefix}.{name}"]
+            if spec["length"]:
+                column = np.memmap(
+                    path, dtype=spec["dtype"], mode="r",
+                    offset=start + spec["offset"], shape=(spec["length"],),
+                )
             else:
-                print(f"Missing data: {neo_data}")
+                column = np.empty(0, spec["dtype"])
+            part._columns[name] = column
+            part.size = spec["length"]
+    table.diameter_sum = header["diameter_sum"]
+    table.hazardous_count = header["hazardous_count"]
+    return table
+
+
+# Index of a numeric or date column of a table: the row numbers sorted by value,
+# missing (NaN or NaT) values last. Minimum, maximum and range queries are binary searches, and rows
+# appended to the table are merged in at the next query instead of sorting again.
+class SortedIndex:
+    def __init__(self, table, column):
+        self.table = table
+        self.column = column
+        values = getattr(table, column)
+        self.order = np.argsort(values, kind="stable")  # Row numbers by increasing value.
+        self.values = values[self.order]
+        self.size = len(values)
+        self.missing = int(np.count_nonzero(np.isnan(values)))
+
+    def _update(self):
+        # Merge the rows appended to the table since the last query.
+        values = getattr(self.table, self.column)
+        if len(values) == self.size:
+            return
+        new = np.arange(self.size, len(values))
+        new = new[np.argsort(values[new], kind="stable")]
+        at = np.searchsorted(self.values, values[new], side="right")
+        self.order = np.insert(self.order, at, new)
+        self.values = np.insert(self.values, at, values[new])
+        self.size = len(values)
+        self.missing += int(np.count_nonzero(np.isnan(values[new])))
 
-    return neos  # Return the list of NEOs.
+    def _valid(self):
+        # Number of rows with a value, missing values being sorted last.
+        return self.size - self.missing
 
-# Function to filter NEOs based on minimum diameter and hazard status.
+    def min(self):
+        # Row of the smallest value, None when no row has a value.
+        self._update()
+        return int(self.order[0]) if self._valid() else None
+
+    def max(self):
+        # Row of the largest value, None when no row has a value.
+        self._update()
+        valid = self._valid()
+        return int(self.order[valid - 1]) if valid else None
+
+    def range(self, low=-np.inf, high=np.inf):
+        # Rows with low <= value <= high, by increasing value.
+        self._update()
+        start = np.searchsorted(self.values, low, side="left")
+        stop = np.searchsorted(self.values, high, side="right")
+        return self.order[start:stop]
+
+    def smallest(self, k, mask=None):
+        # The k rows of smallest value, smallest first, among the rows where `mask`
+        # is True if given, e.g. table.hazardous.
+        self._update()
+        return self._first(self.order[:self._valid()], k, mask)
+
+    def largest(self, k, mask=None):
+        # The k rows of largest value, largest first, see smallest.
+        self._update()
+        return self._first(self.order[:self._valid()][::-1], k, mask)
+
+    def _first(self, order, k, mask):
+        # First k rows of `order` where `mask` is True, looking at growing blocks of
+        # rows so that only about k / (fraction of True) rows are read.
+        if mask is None:
+            return order[:k]
+        found, count, start, block = [], 0, 0, max(k, 64)
+        while count < k and start < len(order):
+            rows = order[start:start + block]
+            rows = rows[mask[rows]]
+            found.append(rows)
+            count += len(rows)
+            start += block
+            block *= 2
+        return np.concatenate(found)[:k] if found else order[:0]
+
+
+# The k largest NEOs, largest first, from a list of NearEarthObject instances or a
+# NeoTable, only among the hazardous ones with hazardous_only. The sorted diameter
+# index of a table is used when it has one, otherwise a heap (lists) or a partial
+# selection (tables) picks them without sorting the whole set.
+def largest_neos(neos, k=10, hazardous_only=False):
+    return _extreme_neos(neos, k, hazardous_only, largest=True)
+
+
+# The k smallest NEOs, smallest first, see largest_neos.
+def smallest_neos(neos, k=1, hazardous_only=False):
+    return _extreme_neos(neos, k, hazardous_only, largest=False)
+
+
+def _extreme_neos(neos, k, hazardous_only, largest):
+    if not isinstance(neos, NeoTable):
+        if hazardous_only:
+            neos = (neo for neo in neos if neo.is_potentially_hazardous)
+        select = heapq.nlargest if largest else heapq.nsmallest
+        return select(k, neos, key=lambda neo: neo.diameter)
+
+    mask = neos.hazardous if hazardous_only else None
+    if "diameter" in neos.indexes:
+        index = neos.indexes["diameter"]
+        return neos.rows(index.largest(k, mask) if largest else index.smallest(k, mask))
+
+    rows = np.flatnonzero(mask) if hazardous_only else np.arange(len(neos))
+    rows = rows[~np.isnan(neos.diameter[rows])]
+    values = -neos.diameter[rows] if largest else neos.diameter[rows]
+    if k < len(rows):
+        kept = np.argpartition(values, k)[:k]
+        rows, values = rows[kept], values[kept]
+    return neos.rows(rows[np.argsort(values, kind="stable")])
+
+
+# Function to filter NEOs based on minimum diameter and hazard status, a list of
+# NearEarthObject instances or a NeoTable, filtered with a mask over its columns or,
+# when it has one, with a range query on its diameter index.
 def filter_neos(neos, min_diameter=400, is_potentially_hazardous=True):
+    if isinstance(neos, NeoTable):
+        if "diameter" in neos.indexes:
+            rows = np.sort(neos.indexes["diameter"].range(min_diameter))
+            return neos[rows[neos.hazardous[rows] == is_potentially_hazardous]]
+        return neos[(neos.diameter >= min_diameter) & (neos.hazardous == is_potentially_hazardous)]
     filtered_neos = [
         neo for neo in neos 
         if neo.diameter >= min_diameter and neo.is_potentially_hazardous == is_potentially_hazardous
@@ -45,44 +569,71 @@ def filter_neos(neos, min_diameter=400, is_potentially_hazardous=True):
     return filtered_neos
 
 # Class to analyze NEO data for properties like average diameter and hazard count.
+# The aggregates are computed once, or read from a NeoTable which maintains them,
+# and updated by add instead of scanning all the NEOs for every query.
 class NeoAnalyzer:
     def __init__(self, neos):
-        # Initialize NeoAnalyzer with a list of Near-Earth Objects.
+        # Initialize NeoAnalyzer with a list of Near-Earth Objects or a NeoTable.
         self.neos = neos
+        if not isinstance(neos, NeoTable):
+            self._count = len(neos)
+            self._diameter_sum = sum(neo.diameter for neo in neos)
+            self._hazardous_count = sum(1 for neo in neos if neo.is_potentially_hazardous)
+
+    def add(self, neo):
+        # Add a NearEarthObject to the list and to the aggregates, or a (date, entry)
+        # pair of the feed to a NeoTable.
+        if isinstance(self.neos, NeoTable):
+            self.neos.extend([neo])
+            return
+        self.neos.append(neo)
+        self._count += 1
+        self._diameter_sum += neo.diameter
+        self._hazardous_count += 1 if neo.is_potentially_hazardous else 0
 
     def average_diameter(self):
         # Calculate the average diameter of the NEOs.
-        if not self.neos:
+        if isinstance(self.neos, NeoTable):
+            count, total = len(self.neos), self.neos.diameter_sum
+        else:
+            count, total = self._count, self._diameter_sum
+        if not count:
             return 0
-        tot_dia = sum(neo.diameter for neo in self.neos)
-        average = tot_dia / len(self.neos)
-        return average
+        return total / count
 
     def count_potentially_hazardous(self):
         # Count the number of potentially hazardous NEOs.
-        return sum(1 for neo in self.neos if neo.is_potentially_hazardous)
+        if isinstance(self.neos, NeoTable):
+            return self.neos.hazardous_count
+        return self._hazardous_count
+
+
+# Main function to analyze the NEOs of 'neos.json'.
+def main():
+    # Read NEO data from 'neos.json' and store it in columns.
+    neos = load_neos('neos.json')
+
+    # Filter NEOs based on diameter and hazard status.
+    danger_neos = filter_neos(neos, min_diameter=400, is_potentially_hazardous=True)
+    print(f"Potentially hazardous NEOs : {len(danger_neos)}\n")
 
-# Read NEO data from 'neos.json' and store in a list.
-neos = read_json('neos.json')
+    # Print information of filtered hazardous NEOs.
+    for neo in danger_neos:
+        print(f"Name: {neo.name}, Diameter: {neo.diameter} meters, Hazardous: {neo.is_potentially_hazardous}")
 
-# Filter NEOs based on diameter and hazard status.
-danger_neos = filter_neos(neos, min_diameter=400, is_potentially_hazardous=True)
-print(f"Potentially hazardous NEOs : {len(danger_neos)}\n")
+    # Create an instance of NeoAnalyzer and calculate the average diameter.
+    analyzer = NeoAnalyzer(neos)
+    avg_diameter = analyzer.average_diameter()
+    print(f"\nAverage diameter of NEOs: {avg_diameter} meters")
 
-# Print information of filtered hazardous NEOs.
-for neo in danger_neos:
-    print(f"Name: {neo.name}, Diameter: {neo.diameter} meters, Hazardous: {neo.is_potentially_hazardous}")
+    # Count potentially hazardous NEOs.
+    hazard_count = analyzer.count_potentially_hazardous()
+    print(f"Potentially hazardous NEOs: {hazard_count}")
 
-# Create an instance of NeoAnalyzer and calculate the average diameter.
-analyzer = NeoAnalyzer(neos)
-avg_diameter = analyzer.average_diameter()
-print(f"\nAverage diameter of NEOs: {avg_diameter} meters")
+    # Find the smallest NEO with a partial selection, without sorting them all.
+    smallest_neo = smallest_neos(neos, 1)[0]
+    print(f"The smallest NEO is {smallest_neo.name} with a diameter of {smallest_neo.diameter} meters.")
 
-# Count potentially hazardous NEOs.
-hazard_count = analyzer.count_potentially_hazardous()
-print(f"Potentially hazardous NEOs: {hazard_count}")
 
-# Sort NEOs by diameter and print the smallest one.
-sorted_neos = sorted(neos)
-smallest_neo = sorted_neos[0]
-print(f"The smallest NEO is {smallest_neo.name} with a diameter of {smallest_neo.diameter} meters.")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
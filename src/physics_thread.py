@@ -0,0 +1,101 @@
+from typing import Any, Callable, List, Optional
+from collections import namedtuple
+import threading
+
+Snapshot = namedtuple("Snapshot", ["step", "time", "state"])
+
+
+class SnapshotRing:
+    """Ring buffer of the last snapshots published by a single writer.
+
+    Publishing stores a reference to the snapshot in the next slot and only
+    then bumps the sequence number. Both are single reference assignments,
+    atomic in Python, and the states returned by `update` callbacks are new
+    objects that are never modified afterwards, so readers always see a
+    complete snapshot without taking any lock.
+    """
+
+    def __init__(self, first: Snapshot, capacity: int = 3):
+        self._slots: List[Snapshot] = [first] * capacity
+        self.sequence = 0
+
+    def publish(self, snapshot: Snapshot):
+        self._slots[(self.sequence + 1) % len(self._slots)] = snapshot
+        self.sequence += 1
+
+    def latest(self) -> Snapshot:
+        return self._slots[self.sequence % len(self._slots)]
+
+
+class PhysicsThread(threading.Thread):
+    """Worker thread calling `update(state, dt)` in a loop, independently of
+    the rendering.
+
+    With `steps_per_frame` set to 0 the worker runs as many steps as it can,
+    otherwise it runs that many steps for each call to `frame`, i.e. for each
+    rendered frame. Every step is published into a `SnapshotRing`, the steps
+    being counted from `step` and the time from `time`.
+    """
+
+    def __init__(
+        self,
+        update: Callable[[Any, float], Any],
+        state: Any,
+        dt: float,
+        steps_per_frame: int = 0,
+        step: int = 0,
+        time: float = 0.0,
+    ):
+        super().__init__(daemon=True)
+        self.update = update
+        self.dt = dt
+        self.steps_per_frame = steps_per_frame
+        self.snapshots = SnapshotRing(Snapshot(step=step, time=time, state=state))
+        self.paused = False
+        self.error: Optional[BaseException] = None
+
+        self._frames = 0
+        self._start_step = step  # the frame budget counts the steps from here
+        self._wake = threading.Event()
+        self._stopping = threading.Event()
+
+    def _waiting(self, step: int) -> bool:
+        return self.paused or (
+            self.steps_per_frame > 0 and
+            step - self._start_step >= self._frames * self.steps_per_frame
+        )
+
+    def run(self):
+        snapshot = self.snapshots.latest()
+        try:
+            while not self._stopping.is_set():
+                if self._waiting(snapshot.step):
+                    # clear before checking again so that no wake up is lost
+                    self._wake.clear()
+                    if self._waiting(snapshot.step):
+                        self._wake.wait(0.1)
+                    continue
+
+                state = self.update(snapshot.state, self.dt)
+                snapshot = Snapshot(
+                    step=snapshot.step + 1,
+                    time=snapshot.time + self.dt,
+                    state=state,
+                )
+                self.snapshots.publish(snapshot)
+        except BaseException as e:
+            self.error = e
+
+    def frame(self) -> Snapshot:
+        """Give the worker the steps of one more frame and return the latest
+        snapshot, raising any error that stopped the worker."""
+        if self.error is not None:
+            raise self.error
+        if not self.paused:
+            self._frames += 1
+            self._wake.set()
+        return self.snapshots.latest()
+
+    def stop(self):
+        self._stopping.set()
+        self._wake.set()
@@ -0,0 +1,107 @@
+from typing import Dict, List
+from collections import deque
+import json
+import time
+
+import numpy as np
+
+# Phases of a frame of `Simulation.loop`, in order.
+PHASES = ("events", "render", "wait", "update", "trails")
+WINDOW = 300  # Frames kept for the rolling percentiles, 10 s at 30 fps.
+
+
+class FrameProfiler:
+    """Wall time of every phase of the frames of `Simulation.loop`.
+
+    The loop calls `phase` at the end of each phase with the time returned by
+    the previous call, and `end_frame` once per frame. The durations of the
+    last `window` frames are kept for the percentiles, the totals cover the
+    whole run.
+    """
+
+    def __init__(self, window: int = WINDOW):
+        self.window = window
+        self.durations: Dict[str, deque] = {p: deque(maxlen=window) for p in PHASES}
+        self.totals: Dict[str, float] = dict.fromkeys(PHASES, 0.0)
+        self.steps: deque = deque(maxlen=window)
+        self.frames = 0
+        self.bodies = 0
+        self.trail_points = 0
+        self.started = time.perf_counter()
+
+    @staticmethod
+    def now() -> float:
+        return time.perf_counter()
+
+    def phase(self, name: str, start: float) -> float:
+        """Record the phase `name` started at `start`, and return the current
+        time, i.e. the start of the next phase."""
+        now = time.perf_counter()
+        ms = (now - start) * 1000
+        self.durations[name].append(ms)
+        self.totals[name] += ms
+        return now
+
+    def end_frame(self, steps: int, bodies: int, trail_points: int):
+        self.frames += 1
+        self.steps.append(steps)
+        self.bodies = bodies
+        self.trail_points = trail_points
+
+    def percentiles(self, name: str) -> Dict[str, float]:
+        durations = np.fromiter(self.durations[name], dtype=float)
+        if len(durations) == 0:
+            return {"p50": 0.0, "p90": 0.0, "p99": 0.0, "max": 0.0}
+        p50, p90, p99 = np.percentile(durations, [50, 90, 99])
+        return {
+            "p50": float(p50),
+            "p90": float(p90),
+            "p99": float(p99),
+            "max": float(durations.max()),
+        }
+
+    def step_ms(self) -> float:
+        """Mean duration of one call to `update` over the window. With
+        threaded physics the update phase only fetches the latest snapshot,
+        see `steps_per_frame` instead."""
+        steps = sum(self.steps)
+        return sum(self.durations["update"]) / steps if steps else 0.0
+
+    def steps_per_frame(self) -> float:
+        return sum(self.steps) / len(self.steps) if self.steps else 0.0
+
+    def summary(self) -> Dict:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "frames": self.frames,
+            "elapsed": elapsed,
+            "fps": self.frames / elapsed if elapsed > 0 else 0.0,
+            "window": self.window,
+            "step_ms": self.step_ms(),
+            "steps_per_frame": self.steps_per_frame(),
+            "bodies": self.bodies,
+            "trail_points": self.trail_points,
+            "phases": {
+                name: dict(
+                    total_ms=self.totals[name],
+                    mean_ms=self.totals[name] / self.frames if self.frames else 0.0,
+                    **self.percentiles(name),
+                )
+                for name in PHASES
+            },
+        }
+
+    def overlay(self, fps: float) -> List[str]:
+        """Lines of text of the on-screen overlay."""
+        render = self.percentiles("render")
+        return [
+            f"fps {fps:.1f}",
+            f"step {self.step_ms():.2f} ms, {self.steps_per_frame():.1f} per frame",
+            f"render {render['p50']:.2f} ms (p99 {render['p99']:.2f})",
+            f"bodies {self.bodies}",
+            f"trail points {self.trail_points}",
+        ]
+
+    def dump(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
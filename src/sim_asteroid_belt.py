@@ -0,0 +1,105 @@
+from typing import Tuple
+
+from nbody import G, SystemState, make_update
+from nbody.barnes_hut import BarnesHut, force_error
+import numpy as np
+
+AU = 14959787070  # Astronomical unit in meters (scaled value, see sim_solar_system.py)
+
+SUN_MASS = 1.9885e30  # Mass of the Sun in kg
+JUPITER_MASS = 1.8982e27  # Mass of Jupiter in kg
+
+DT = 10000  # Time step of the simulation in seconds
+THETA = 0.7  # Opening angle of the Barnes-Hut force backend
+
+update = make_update(BarnesHut(THETA))
+
+
+def belt_orbits(n: int, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Positions and velocities of `n` asteroids on slightly eccentric and
+    inclined orbits between 2.1 and 3.3 AU around the Sun at the origin.
+    """
+    # Orbital elements of the asteroids
+    semi_major_axis = rng.uniform(2.1, 3.3, n) * AU
+    eccentricity = rng.uniform(0.0, 0.2, n)
+    inclination = np.radians(rng.uniform(0.0, 10.0, n))
+    node = rng.uniform(0.0, 2 * np.pi, n)  # Longitude of the ascending node
+    phase = rng.uniform(0.0, 2 * np.pi, n)  # Angle from the perihelion
+
+    # Position and velocity in the orbital plane, vis-viva for the speed
+    distance = semi_major_axis * (1 - eccentricity ** 2) / (1 + eccentricity * np.cos(phase))
+    speed = np.sqrt(G * SUN_MASS * (2 / distance - 1 / semi_major_axis))
+    flight_angle = np.arctan2(eccentricity * np.sin(phase), 1 + eccentricity * np.cos(phase))
+    x, y = distance * np.cos(phase), distance * np.sin(phase)
+    vx = -speed * np.sin(phase - flight_angle)
+    vy = speed * np.cos(phase - flight_angle)
+
+    # Rotate the orbital plane by the inclination around the node line
+    def to_space(u, v):
+        cos_node, sin_node = np.cos(node), np.sin(node)
+        u_node = u * cos_node + v * sin_node
+        v_node = -u * sin_node + v * cos_node
+        v_plane = v_node * np.cos(inclination)
+        return np.stack([
+            u_node * cos_node - v_plane * sin_node,
+            u_node * sin_node + v_plane * cos_node,
+            v_node * np.sin(inclination),
+        ], axis=1)
+
+    return to_space(x, y), to_space(vx, vy)
+
+
+def asteroid_belt(n: int, seed: int = 0) -> SystemState:
+    """
+    Build the Sun, Jupiter and `n` asteroids on slightly eccentric and inclined
+    orbits between 2.1 and 3.3 AU. The Sun is pinned at the origin.
+    """
+    rng = np.random.default_rng(seed)
+    asteroid_pos, asteroid_vel = belt_orbits(n, rng)
+
+    jupiter_distance = 5.2 * AU
+    jupiter_speed = (G * SUN_MASS / jupiter_distance) ** 0.5
+
+    pos = np.vstack([[0, 0, 0], [jupiter_distance, 0, 0], asteroid_pos])
+    vel = np.vstack([[0, 0, 0], [0, jupiter_speed, 0], asteroid_vel])
+    return SystemState(
+        pos=pos,
+        vel=vel,
+        mass=np.concatenate([[SUN_MASS, JUPITER_MASS], 10 ** rng.uniform(15, 20, n)]),
+        density=np.concatenate([[1.408, 1.326], np.full(n, 2.0)]),
+        color=[(255, 255, 0), (165, 42, 42)] + [(150, 150, 150)] * n,
+        fixed=np.arange(n + 2) == 0,
+    )
+
+
+def initial_state(n: int = 10_000) -> SystemState:
+    return asteroid_belt(n)
+
+
+def main():
+    # Imported here so that the scenario can run without pygame
+    from ui import Simulation
+
+    bodies = initial_state()
+    print("Barnes-Hut force error:", force_error(bodies.pos, bodies.mass, THETA))
+
+    # Simulation setup
+    simulation = Simulation(
+        frame_rate=30,
+        width=800,
+        height=800,
+        caption="Asteroid Belt",
+        dt=DT,
+        trail_length=0,
+    )
+    simulation.setup()
+    simulation.center = (0, 0)
+    simulation.zoom = 5e-9
+
+    # Run the simulation with the Barnes-Hut force backend
+    simulation.loop(initial_state=bodies, update=update)
+
+
+if __name__ == "__main__":
+    main()
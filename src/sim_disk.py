@@ -0,0 +1,79 @@
+from nbody import G, SystemState, make_update
+from nbody.barnes_hut import BarnesHut, force_error
+import numpy as np
+
+AU = 14959787070  # Astronomical unit in meters (scaled value, see sim_solar_system.py)
+
+STAR_MASS = 1.9885e30  # Mass of the central star in kg
+
+DT = 10000  # Time step of the simulation in seconds
+THETA = 0.7  # Opening angle of the Barnes-Hut force backend
+# Plummer softening length of the forces in meters. The particles stand for a
+# continuous disk, without it their close encounters need far smaller steps
+# than DT and the energy drifts by tens of percent in a few hundred steps.
+EPS = 0.05 * AU
+
+update = make_update(BarnesHut(THETA, eps=EPS))
+
+
+def disk(n: int, disk_mass: float = 0.1 * STAR_MASS, seed: int = 0) -> SystemState:
+    """
+    Build a thin self-gravitating disk of `n` particles between 1 and 30 AU
+    around a central star. Each particle is put on a circular orbit around the
+    star and the disk mass inside its radius.
+    """
+    rng = np.random.default_rng(seed)
+
+    # Surface density decreasing as 1 / r: uniform radius distribution
+    radius = rng.uniform(1.0, 30.0, n) * AU
+    angle = rng.uniform(0.0, 2 * np.pi, n)
+    height = rng.normal(0.0, 0.01, n) * radius  # Thin vertical structure
+    mass = np.full(n, disk_mass / n)
+
+    order = np.argsort(radius)
+    enclosed = np.empty(n)
+    enclosed[order] = STAR_MASS + np.cumsum(mass[order])  # Mass inside each orbit
+    speed = np.sqrt(G * enclosed / radius)
+
+    pos = np.stack([radius * np.cos(angle), radius * np.sin(angle), height], axis=1)
+    vel = np.stack([-speed * np.sin(angle), speed * np.cos(angle), np.zeros(n)], axis=1)
+    return SystemState(
+        pos=np.vstack([[0, 0, 0], pos]),
+        vel=np.vstack([[0, 0, 0], vel]),
+        mass=np.concatenate([[STAR_MASS], mass]),
+        density=np.concatenate([[1.408], np.full(n, 1.0)]),
+        color=[(255, 255, 0)] + [(200, 120, 60)] * n,
+        fixed=np.zeros(n + 1, dtype=bool),
+    )
+
+
+def initial_state(n: int = 10_000) -> SystemState:
+    return disk(n)
+
+
+def main():
+    # Imported here so that the scenario can run without pygame
+    from ui import Simulation
+
+    bodies = initial_state()
+    print("Barnes-Hut force error:", force_error(bodies.pos, bodies.mass, THETA, eps=EPS))
+
+    # Simulation setup
+    simulation = Simulation(
+        frame_rate=30,
+        width=800,
+        height=800,
+        caption="Self-gravitating Disk",
+        dt=DT,
+        trail_length=0,
+    )
+    simulation.setup()
+    simulation.center = (0, 0)
+    simulation.zoom = 1e-9
+
+    # Run the simulation with the Barnes-Hut force backend
+    simulation.loop(initial_state=bodies, update=update)
+
+
+if __name__ == "__main__":
+    main()
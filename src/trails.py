@@ -0,0 +1,85 @@
+from typing import Dict
+
+import numpy as np
+
+
+class TrailBuffer:
+    """Last `length` positions of every body, in the plane of the screen.
+
+    The points live in a preallocated (bodies, 2 * length, 2) array written
+    as a ring buffer where every point is stored twice, `length` slots apart,
+    so that the last `length` points are always a contiguous slice of it:
+    reading the trails, oldest point first, never copies anything and the
+    memory used does not grow with the length of the run.
+    """
+
+    def __init__(self, bodies: int, length: int):
+        self.length = length
+        self.data = np.zeros((bodies, 2 * length, 2))
+        self.head = 0  # slot of the next point
+        self.count = 0  # points per trail
+        self.version = 0  # incremented at every change, for caches
+
+    def __len__(self) -> int:
+        return self.count
+
+    def append(self, points: np.ndarray):
+        """Add one (bodies, 2) array of positions at the end of the trails."""
+        if self.length == 0:
+            return
+        self.data[:, self.head] = points
+        self.data[:, self.head + self.length] = points
+        self.head = (self.head + 1) % self.length
+        self.count = min(self.count + 1, self.length)
+        self.version += 1
+
+    def keep(self, bodies: np.ndarray):
+        """Keep the trails of the `bodies` indices only, in that order, e.g.
+        after collisions merged some bodies."""
+        self.data = self.data[bodies]
+        self.version += 1
+
+    def clear(self, bodies: int):
+        """Drop every point, for `bodies` bodies from now on."""
+        self.data = np.zeros((bodies, 2 * self.length, 2))
+        self.head = 0
+        self.count = 0
+        self.version += 1
+
+    def checkpoint_state(self) -> Dict[str, np.ndarray]:
+        """Copy of the trails, see `nbody.checkpoint`."""
+        return {"points": self.points().copy()}
+
+    @classmethod
+    def from_checkpoint(
+        cls, values: Dict[str, np.ndarray], bodies: int, length: int
+    ) -> "TrailBuffer":
+        """Trails saved by `checkpoint_state`, the oldest points being dropped
+        if `length` is shorter than before. Empty trails when `values` do not
+        match the number of bodies."""
+        trails = cls(bodies, length)
+        points = values.get("points")
+        if points is None or len(points) != bodies or length == 0:
+            return trails
+        kept = points[:, max(0, points.shape[1] - length):]
+        count = kept.shape[1]
+        trails.data[:, :count] = kept
+        trails.data[:, length:length + count] = kept
+        trails.head = count % length
+        trails.count = count
+        trails.version = 1
+        return trails
+
+    def points(self, skip: int = 1) -> np.ndarray:
+        """(bodies, points, 2) view of the trails, oldest point first, keeping
+        one point every `skip`."""
+        end = self.head + self.length
+        return self.data[:, end - self.count:end:skip]
+
+    def relative_to(
+        self, body: int, position: np.ndarray, skip: int = 1
+    ) -> np.ndarray:
+        """Trails as seen from `body`, now at `position`: every point is moved
+        by the displacement of `body` since that point was recorded."""
+        points = self.points(skip)
+        return points - points[body] + position
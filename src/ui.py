@@ -1,17 +1,54 @@
-from typing import Callable, Any, List, Tuple
+from typing import Callable, Any, List, Optional, Tuple
 from dataclasses import dataclass
 from collections import namedtuple
 from math import pi
-from collections import deque
 
-from vec3 import Vector3d as Vec3
+from physics_thread import PhysicsThread
+from profiler import FrameProfiler
+from trails import TrailBuffer
 
+import numpy as np
 import pygame
 import sys
 
 State = List[Any]
+Color = Tuple[int, int, int]
 UIState = namedtuple("UIState", ["pause", "locked", "mouse"])
 
+# Bodies with a radius below this many pixels, which `pygame.draw.circle`
+# would not draw, are drawn as a single pixel all at once.
+SUBPIXEL_RADIUS = 1.0
+# Trails are decimated so that their drawn segments are about this many
+# pixels long on average, zooming out drops points instead of drawing
+# segments shorter than a pixel.
+TRAIL_SEGMENT = 1.0
+
+
+def positions(state: State) -> np.ndarray:
+    """(N, 2) array of the positions of the bodies in the plane of the screen."""
+    pos = getattr(state, "pos", None)
+    if isinstance(pos, np.ndarray):
+        return pos[:, :2]
+    return np.array([(s.pos.x, s.pos.y) for s in state], dtype=float).reshape(-1, 2)
+
+
+def radii(state: State) -> np.ndarray:
+    """(N,) array of the radii of the bodies, from their mass and density."""
+    mass = getattr(state, "mass", None)
+    if isinstance(mass, np.ndarray):
+        density = state.density
+    else:
+        mass = np.array([s.mass for s in state], dtype=float)
+        density = np.array([s.density for s in state], dtype=float)
+    return (3 * mass / (4 * pi * density)) ** 0.333
+
+
+def colors(state: State) -> List[Color]:
+    color = getattr(state, "color", None)
+    if isinstance(color, list):
+        return color
+    return [s.color for s in state]
+
 
 @dataclass
 class Simulation:
@@ -27,8 +64,31 @@ class Simulation:
     trail_width: int = 1
     trail_skip: int = 1
     wheel_sensitivity: float = 0.1
+    # number of calls to `update` per rendered frame, with `threaded` physics
+    # 0 means as many as the CPU allows
+    substeps: int = 1
+    threaded: bool = False
+    # time every phase of the frames, show the timings over the scene with
+    # `overlay` (toggled with P) and write them as JSON to `profile_path` when
+    # the window is closed
+    profile: bool = False
+    overlay: bool = False
+    profile_path: Optional[str] = None
+    # write a checkpoint with the trails to `checkpoint_path` every
+    # `checkpoint_every` steps and when the window is closed, see
+    # `nbody.checkpoint`
+    checkpoint_path: Optional[str] = None
+    checkpoint_every: int = 0
     screen: pygame.surface.Surface = None
     clock: pygame.time.Clock = None
+    font: pygame.font.Font = None
+
+    def __post_init__(self):
+        if self.substeps < 0 or (self.substeps == 0 and not self.threaded):
+            raise ValueError(
+                f"substeps must be at least 1, or 0 with threaded physics, "
+                f"got {self.substeps}"
+            )
 
     def setup(self):
         pygame.init()
@@ -38,14 +98,70 @@ class Simulation:
 
         self.clock = pygame.time.Clock()
 
-    def __to_pizel_coordinates(self, pos: Vec3) -> Tuple[float, float]:
-        canvas_center = Vec3(self.width, self.height, 0) / 2
-        canvas_center_offset = Vec3(*self.center_offset, 0)
-        world_center = Vec3(self.center[0], self.center[1], 0)
+    def __to_pixels(self, points: np.ndarray) -> np.ndarray:
+        """Screen coordinates of an (..., 2) array of positions."""
+        canvas_center = (
+            self.width / 2 - self.center_offset[0],
+            self.height / 2 - self.center_offset[1],
+        )
+        return (points - self.center) * self.zoom + canvas_center
+
+    def __trail_lines(
+        self,
+        trails: TrailBuffer,
+        locked: Optional[int],
+        xy: np.ndarray,
+    ) -> List[Optional[list]]:
+        """Points of the trail of every body in screen coordinates, None for
+        the trails not drawn. The result is cached and only recomputed when
+        the trails, the view or the locked body change.
+
+        Trails entirely off screen or shorter than a pixel, covered by their
+        body, are not drawn. The others keep one point every few so that
+        their segments are about `TRAIL_SEGMENT` pixels long, the first and
+        last points always being kept."""
+        key = (
+            trails.version, locked, self.trail_skip, self.zoom, self.center,
+            self.center_offset, self.width, self.height,
+        )
+        if key == self._trail_key:
+            return self._trail_lines
 
-        res = canvas_center - canvas_center_offset + \
-            (pos - world_center) * self.zoom
-        return (res.x, res.y)
+        if locked is None:
+            points = trails.points(self.trail_skip)
+        else:
+            points = trails.relative_to(locked, xy[locked], self.trail_skip)
+
+        self._trail_lines = [None] * len(points)
+        self._trail_key = key
+        count = points.shape[1]
+        if count < 2:
+            return self._trail_lines
+
+        pixels = self.__to_pixels(points)
+        low, high = pixels.min(axis=1), pixels.max(axis=1)
+        margin = self.trail_width
+        visible = (
+            (high >= -margin).all(axis=1) &
+            (low[:, 0] <= self.width + margin) &
+            (low[:, 1] <= self.height + margin) &
+            ((high - low).max(axis=1) >= TRAIL_SEGMENT)
+        )
+        if locked is not None:
+            visible[locked] = False
+
+        segments = np.diff(pixels, axis=1)
+        length = np.sqrt((segments ** 2).sum(axis=2)).sum(axis=1)
+        wanted = np.maximum(length / TRAIL_SEGMENT, 1)
+        strides = np.clip((count - 1) // wanted, 1, count - 1).astype(int)
+
+        kept = {}  # indices of the points kept for every stride
+        for i in np.flatnonzero(visible).tolist():
+            stride = strides[i]
+            if stride not in kept:
+                kept[stride] = np.r_[0:count - 1:stride, count - 1]
+            self._trail_lines[i] = pixels[i, kept[stride]].tolist()
+        return self._trail_lines
 
     def __handle_events(
         self,
@@ -64,6 +180,8 @@ class Simulation:
             if event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_SPACE:
                     pause = not ui.pause
+                elif event.key == pygame.K_p:
+                    self.overlay = not self.overlay
                 elif event.key == pygame.K_f:
                     locked = None
                 elif event.key == pygame.K_k:
@@ -97,51 +215,129 @@ class Simulation:
 
     def __render(
         self,
-        trails: List[List[Vec3]],
+        trails: TrailBuffer,
         state: State,
         locked: int,
+        profiler: Optional[FrameProfiler],
     ):
         self.screen.fill((0, 0, 0))
 
-        for i, (t, s) in enumerate(zip(trails, state)):
-            # let's cook some spaghetti lol
-            if self.trail_skip > 1:
-                t = list(t)[::self.trail_skip]
-            if len(t) >= 2 and i != locked:
-                if locked is None:
-                    _t = t
-                else:
-                    if self.trail_skip > 1:
-                        focused_trail = list(trails[locked])[::self.trail_skip]
-                    else:
-                        focused_trail = trails[locked]
-                    _t = [
-                        p - (c - state[locked].pos)
-                        for p, c in zip(t, focused_trail)
-                    ]
+        xy = positions(state)
+        body_pixels = self.__to_pixels(xy)
+        lines = self.__trail_lines(trails, locked, xy)
+        body_colors = colors(state)
+
+        # bodies overlapping the screen, drawn as circles or single pixels
+        radius = radii(state) * self.zoom
+        x, y = body_pixels[:, 0], body_pixels[:, 1]
+        on_screen = (
+            (x + radius >= 0) & (x - radius <= self.width) &
+            (y + radius >= 0) & (y - radius <= self.height)
+        )
+        large = on_screen & (radius >= SUBPIXEL_RADIUS)
+        has_line = np.fromiter((line is not None for line in lines), bool, len(lines))
+
+        # one draw call per visible trail and large body, in the order of the
+        # bodies so that they overlap like before
+        for i in np.flatnonzero(large | has_line).tolist():
+            if lines[i] is not None:
                 pygame.draw.lines(
                     self.screen,
-                    s.color,
+                    body_colors[i],
                     False,
-                    list(map(self.__to_pizel_coordinates, _t)),
+                    lines[i],
                     width=self.trail_width
                 )
-            pygame.draw.circle(
-                self.screen,
-                s.color,
-                self.__to_pizel_coordinates(s.pos),
-                (3 * s.mass / (4 * pi * s.density)) ** 0.333 * self.zoom,
-            )
+            if large[i]:
+                pygame.draw.circle(
+                    self.screen,
+                    body_colors[i],
+                    body_pixels[i].tolist(),
+                    radius[i],
+                )
+        self.__draw_points(
+            body_pixels[on_screen & ~large], body_colors, on_screen & ~large
+        )
+
+        if self.overlay and profiler is not None:
+            self.__draw_overlay(profiler.overlay(self.clock.get_fps()))
         pygame.display.flip()
 
+    def __draw_points(
+        self,
+        points: np.ndarray,
+        body_colors: List[Color],
+        selected: np.ndarray,
+    ):
+        """Set the pixels under `points` to the colors of the `selected`
+        bodies with a single write into the pixels of the screen."""
+        if len(points) == 0:
+            return
+        if body_colors is not self._colors_source:
+            self._colors = np.array(body_colors, dtype=np.uint8).reshape(-1, 3)
+            self._colors_source = body_colors
+        ix, iy = np.floor(points).astype(int).T
+        inside = (ix >= 0) & (ix < self.width) & (iy >= 0) & (iy < self.height)
+        screen = pygame.surfarray.pixels3d(self.screen)
+        screen[ix[inside], iy[inside]] = self._colors[selected][inside]
+        del screen  # unlocks the surface
+
+    def __draw_overlay(self, lines: List[str]):
+        if self.font is None:
+            self.font = pygame.font.Font(None, 20)
+        for i, line in enumerate(lines):
+            text = self.font.render(line, True, (255, 255, 255))
+            self.screen.blit(text, (8, 8 + i * 18))
+
+    def __bodies_removed(
+        self,
+        trails: TrailBuffer,
+        ui: UIState,
+        bodies: int,
+        kept: Optional[np.ndarray] = None,
+    ) -> UIState:
+        """Follow the bodies kept by `update`, e.g. `nbody.Collisions`, after
+        some were merged: `kept` are their indices in the previous state.
+        The view is unlocked when the locked body was merged into another
+        one, and the trails are cleared when `kept` is not known."""
+        if kept is None or len(kept) != bodies:
+            trails.clear(bodies)
+            return ui._replace(locked=None)
+        trails.keep(kept)
+        locked = None
+        if ui.locked is not None and ui.locked in kept:
+            locked = int(np.searchsorted(kept, ui.locked))
+        return ui._replace(locked=locked)
+
     def loop(
         self,
         initial_state: State,  # the items in the state should all have fields
                                # `pos`, `color` and `mass`
         update: Callable[[State, float], State],
+        resume: Optional[Any] = None,
     ):
-        state = initial_state
-        trails: List[deque] = [deque() for _ in state]
+        """Run the simulation until the window is closed.
+
+        `resume` is an `nbody.checkpoint.Checkpoint` to continue from, in
+        place of `initial_state`: its state, step counter, trails and the
+        internal state of `update` are restored. With threaded physics the
+        internal state of `update` is not saved in the checkpoints, it is
+        changed by the worker while the frame is rendered.
+        """
+        state, step, time = initial_state, 0, 0.0
+        if resume is not None:
+            state, step, time = resume.state, resume.step, resume.time
+            if hasattr(update, "restore"):
+                update.restore(resume.update_state, state)
+        if resume is None:
+            trails = TrailBuffer(len(state), self.trail_length)
+        else:
+            trails = TrailBuffer.from_checkpoint(
+                resume.trails, len(state), self.trail_length
+            )
+        offset = time - step * self.dt  # see `headless.run`
+        self._trail_key = None
+        self._colors_source = None
 
         ui = UIState(pause=False, locked=None, mouse=None)
 
@@ -150,26 +346,83 @@ class Simulation:
             self.center[1] * self.zoom,
         )
 
-        time_step = 0
+        worker = None
+        if self.threaded:
+            worker = PhysicsThread(
+                update, state, self.dt, self.substeps, step=step, time=time
+            )
+            worker.start()
+
+        checkpoints = None
+        if self.checkpoint_path:
+            from nbody.checkpoint import CheckpointWriter
 
-        while True:
-            ui = self.__handle_events(ui, state)
+            checkpoints = CheckpointWriter(
+                self.checkpoint_path, self.dt, self.checkpoint_every,
+                update=None if self.threaded else update, start=step,
+            )
 
-            if ui.locked is not None:
-                center = state[ui.locked].pos
-                self.center = (center.x, center.y)
+        profiler = None
+        try:
+            while True:
+                if profiler is None and (
+                    self.profile or self.overlay or self.profile_path
+                ):
+                    profiler = FrameProfiler()
+                if profiler is not None:
+                    t = profiler.now()
 
-            self.__render(trails, state, ui.locked)
-            self.clock.tick(self.frame_rate)
+                ui = self.__handle_events(ui, state)
+                if profiler is not None:
+                    t = profiler.phase("events", t)
 
-            if not ui.pause:
-                state = update(state, self.dt)
+                if ui.locked is not None:
+                    center = state[ui.locked].pos
+                    self.center = (center.x, center.y)
 
-                if self.trail_length > 0:
-                    for ti, s in zip(trails, state):
-                        ti.append(s.pos)
-                    if time_step > self.trail_length:
-                        for t in trails:
-                            t.popleft()
+                self.__render(trails, state, ui.locked, profiler)
+                if profiler is not None:
+                    t = profiler.phase("render", t)
+                self.clock.tick(self.frame_rate)
+                if profiler is not None:
+                    t = profiler.phase("wait", t)
+
+                if worker is not None:
+                    worker.paused = ui.pause
+                    snapshot = worker.frame()
+                    steps = snapshot.step - step
+                    if len(snapshot.state) != len(state):
+                        # the bodies kept are only known step by step
+                        ui = self.__bodies_removed(trails, ui, len(snapshot.state))
+                    step, time, state = snapshot
+                else:
+                    steps = 0 if ui.pause else self.substeps
+                    for _ in range(steps):
+                        new = update(state, self.dt)
+                        if len(new) != len(state):
+                            ui = self.__bodies_removed(
+                                trails, ui, len(new), getattr(update, "kept", None)
+                            )
+                        state = new
+                    step += steps
+                    time = step * self.dt + offset
+                if profiler is not None:
+                    t = profiler.phase("update", t)
 
-            time_step += 1
+                if steps > 0:
+                    trails.append(positions(state))
+                    if checkpoints is not None:
+                        checkpoints(step, time, state, trails)
+                if profiler is not None:
+                    profiler.phase("trails", t)
+                    profiler.end_frame(steps, len(state), len(state) * len(trails))
+        finally:
+            # the worker is stopped first, so that the checkpoint and the
+            # profile are written while no step is running
+            if worker is not None:
+                worker.stop()
+                worker.join()
+            if checkpoints is not None:
+                checkpoints.close()
+            if profiler is not None and self.profile_path:
+                profiler.dump(self.profile_path)
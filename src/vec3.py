@@ -1,48 +1,104 @@
-from typing import Union
+from typing import Iterable, Iterator, Optional, Union
 from math import sqrt
 
+import numpy as np
+
+Scalar = Union[int, float]
+
+
+def _is_scalar(other) -> bool:
+    return isinstance(other, (int, float))
+
+
+def _type_error(op: str, left, right) -> TypeError:
+    return TypeError(
+        f"unsupported operand type(s) for {op}: '{type(left).__name__}' "
+        f"and '{type(right).__name__}'"
+    )
+
 
 class Vector3d:
-    def __init__(
-        self, x: Union[int, float], y: Union[int, float], z: Union[int, float]
-    ):
+    __slots__ = ("x", "y", "z")
+
+    def __init__(self, x: Scalar, y: Scalar, z: Scalar):
         self.x = x
         self.y = y
         self.z = z
 
+    # Other operands, e.g. a `Vec3Array`, get NotImplemented so that their
+    # reflected operator runs instead of a Vector3d of arrays being built.
     def __add__(self, other):
+        if type(other) is not Vector3d and not isinstance(other, Vector3d):
+            return NotImplemented
         return Vector3d(self.x + other.x, self.y + other.y, self.z + other.z)
 
     def __sub__(self, other):
+        if type(other) is not Vector3d and not isinstance(other, Vector3d):
+            return NotImplemented
         return Vector3d(self.x - other.x, self.y - other.y, self.z - other.z)
 
-    def __mul__(self, other: Union[int, float]):
-        if not (isinstance(other, int) or isinstance(other, float)):
-            raise TypeError(
-                f"unsupported operand type(s) for *: '{type(other).__name__}' "
-                "and 'Vector3d'"
-            )
+    def __mul__(self, other: Scalar):
+        # exact type checks first, much cheaper than `isinstance` and enough
+        # for nearly every call made by the simulations
+        t = type(other)
+        if t is not float and t is not int and not _is_scalar(other):
+            raise _type_error("*", self, other)
 
         return Vector3d(self.x * other, self.y * other, self.z * other)
 
-    def __rmul__(self, other: Union[int, float]):
-        if not (isinstance(other, int) or isinstance(other, float)):
-            raise TypeError(
-                "unsupported operand type(s) for *: 'Vector3d' and "
-                f"'{type(other).__name__}'"
-            )
+    def __rmul__(self, other: Scalar):
+        t = type(other)
+        if t is not float and t is not int and not _is_scalar(other):
+            raise _type_error("*", other, self)
 
         return Vector3d(self.x * other, self.y * other, self.z * other)
 
-    def __truediv__(self, other: Union[int, float]):
-        if not (isinstance(other, int) or isinstance(other, float)):
-            raise TypeError(
-                "unsupported operand type(s) for /: 'Vector3d' and "
-                f"'{type(other).__name__}'"
-            )
+    def __truediv__(self, other: Scalar):
+        t = type(other)
+        if t is not float and t is not int and not _is_scalar(other):
+            raise _type_error("/", self, other)
 
         return Vector3d(self.x / other, self.y / other, self.z / other)
 
+    def __iadd__(self, other):
+        if type(other) is not Vector3d and not isinstance(other, Vector3d):
+            return NotImplemented
+        self.x += other.x
+        self.y += other.y
+        self.z += other.z
+        return self
+
+    def __isub__(self, other):
+        if type(other) is not Vector3d and not isinstance(other, Vector3d):
+            return NotImplemented
+        self.x -= other.x
+        self.y -= other.y
+        self.z -= other.z
+        return self
+
+    def __imul__(self, other: Scalar):
+        t = type(other)
+        if t is not float and t is not int and not _is_scalar(other):
+            raise _type_error("*=", self, other)
+
+        self.x *= other
+        self.y *= other
+        self.z *= other
+        return self
+
+    def __itruediv__(self, other: Scalar):
+        t = type(other)
+        if t is not float and t is not int and not _is_scalar(other):
+            raise _type_error("/=", self, other)
+
+        self.x /= other
+        self.y /= other
+        self.z /= other
+        return self
+
+    def __neg__(self):
+        return Vector3d(-self.x, -self.y, -self.z)
+
     def __repr__(self):
         return "Vector3d({}, {}, {})".format(self.x, self.y, self.z)
 
@@ -50,10 +106,145 @@ class Vector3d:
         return self.x ** 2 + self.y ** 2 + self.z ** 2
 
     def mag(self) -> float:
-        return sqrt(self.mag2())
+        return sqrt(self.x ** 2 + self.y ** 2 + self.z ** 2)
+
+    def norm(self, mag: Optional[float] = None):
+        """Unit vector, `mag` can be given when the magnitude is already known
+        to avoid computing it a second time."""
+        if mag is None:
+            mag = self.mag()
+        return Vector3d(self.x / mag, self.y / mag, self.z / mag)
+
+    def copy(self):
+        return Vector3d(self.x, self.y, self.z)
+
+
+class Vec3Array:
+    """Many `Vector3d` stored in one (N, 3) NumPy array.
+
+    The arithmetic is the same as the one of `Vector3d` and applies to all the
+    vectors at once. Vectors combine element-wise with other `Vec3Array` or
+    with a single `Vector3d`, and scale by a scalar or an (N,) array.
+
+    Indexing with an integer returns a copy of the vector as a `Vector3d`, so
+    `arr[i].x = 1.0` changes nothing: write with `arr[i] = vector` or through
+    the component views, `arr.x[i] = 1.0`. Slices and masks give a new
+    `Vec3Array`.
+    """
+    __slots__ = ("data",)
+
+    def __init__(self, data):
+        self.data = np.asarray(data, dtype=float).reshape(-1, 3)
+
+    @classmethod
+    def from_vectors(cls, vectors: Iterable[Vector3d]) -> "Vec3Array":
+        return cls([(v.x, v.y, v.z) for v in vectors])
+
+    @classmethod
+    def zeros(cls, n: int) -> "Vec3Array":
+        return cls(np.zeros((n, 3)))
+
+    @property
+    def x(self) -> np.ndarray:
+        return self.data[:, 0]
+
+    @property
+    def y(self) -> np.ndarray:
+        return self.data[:, 1]
+
+    @property
+    def z(self) -> np.ndarray:
+        return self.data[:, 2]
+
+    @staticmethod
+    def _vectors(other) -> np.ndarray:
+        if isinstance(other, Vec3Array):
+            return other.data
+        if isinstance(other, Vector3d):
+            return np.array([other.x, other.y, other.z])
+        raise TypeError(
+            "unsupported operand type(s): 'Vec3Array' and "
+            f"'{type(other).__name__}'"
+        )
+
+    @staticmethod
+    def _scalars(other) -> Union[float, np.ndarray]:
+        if _is_scalar(other):
+            return other
+        if isinstance(other, np.ndarray) and other.ndim == 1:
+            return other[:, None]
+        raise TypeError(
+            "unsupported operand type(s): 'Vec3Array' and "
+            f"'{type(other).__name__}'"
+        )
+
+    def __add__(self, other):
+        return Vec3Array(self.data + self._vectors(other))
+
+    def __radd__(self, other):
+        return Vec3Array(self._vectors(other) + self.data)
+
+    def __sub__(self, other):
+        return Vec3Array(self.data - self._vectors(other))
+
+    def __rsub__(self, other):
+        return Vec3Array(self._vectors(other) - self.data)
+
+    def __mul__(self, other):
+        return Vec3Array(self.data * self._scalars(other))
+
+    def __rmul__(self, other):
+        return Vec3Array(self.data * self._scalars(other))
+
+    def __truediv__(self, other):
+        return Vec3Array(self.data / self._scalars(other))
+
+    def __iadd__(self, other):
+        self.data += self._vectors(other)
+        return self
+
+    def __isub__(self, other):
+        self.data -= self._vectors(other)
+        return self
+
+    def __imul__(self, other):
+        self.data *= self._scalars(other)
+        return self
+
+    def __itruediv__(self, other):
+        self.data /= self._scalars(other)
+        return self
+
+    def __neg__(self):
+        return Vec3Array(-self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __getitem__(self, i):
+        if isinstance(i, (int, np.integer)):
+            return Vector3d(*self.data[i].tolist())
+        return Vec3Array(self.data[i])
+
+    def __setitem__(self, i, value):
+        self.data[i] = self._vectors(value)
+
+    def __iter__(self) -> Iterator[Vector3d]:
+        return (Vector3d(x, y, z) for x, y, z in self.data.tolist())
+
+    def __repr__(self):
+        return "Vec3Array({})".format(self.data.tolist())
+
+    def mag2(self) -> np.ndarray:
+        return self.x ** 2 + self.y ** 2 + self.z ** 2
+
+    def mag(self) -> np.ndarray:
+        return np.sqrt(self.mag2())
 
-    def norm(self):
-        return self / self.mag()
+    def norm(self, mag: Optional[np.ndarray] = None) -> "Vec3Array":
+        if mag is None:
+            mag = self.mag()
+        return Vec3Array(self.data / mag[:, None])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,56 @@
+"""
+Object based engine of the original scripts, one `body` per object and one
+`Vector3d` operation at a time, that the array based engine is checked
+against.
+"""
+from vec3 import Vector3d
+
+G = 6.67e-11
+
+
+class body:
+    def __init__(self, pos, vel, mass, density, color, fixed=False):
+        self.pos = pos
+        self.vel = vel
+        self.mass = mass
+        self.density = density
+        self.color = color
+        self.fixed = fixed
+
+    def force(self, other):
+        r = other.pos - self.pos
+        distance = r.mag()
+        if distance == 0:
+            raise ValueError("Distance cannot be zero")
+        force_magnitude = G * self.mass * other.mass / distance**2
+        return r.norm() * force_magnitude
+
+    def update(self, force, dt):
+        if self.fixed:
+            return self
+        acceleration = force / self.mass
+        new_velocity = self.vel + acceleration * dt
+        new_position = self.pos + new_velocity * dt
+        return body(
+            new_position, new_velocity, self.mass, self.density, self.color, self.fixed
+        )
+
+
+def update(bodies, dt):
+    updated_bodies = []
+    for i in range(len(bodies)):
+        b = bodies[i]
+        total_force = Vector3d(0, 0, 0)
+        for j in range(len(bodies)):
+            if i != j:
+                total_force += b.force(bodies[j])
+        updated_bodies.append(b.update(total_force, dt))
+    return updated_bodies
+
+
+def from_state(state):
+    """The bodies of a `SystemState`."""
+    return [
+        body(b.pos, b.vel, b.mass, b.density, b.color, bool(fixed))
+        for b, fixed in zip(state, state.fixed)
+    ]
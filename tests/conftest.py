@@ -0,0 +1,7 @@
+import os
+import sys
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+
+# the scripts and the nbody package import each other from the src directory
+sys.path.insert(0, SRC)
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from nbody import direct_accelerations, load_scenario, make_update
+from nbody.ensemble import BATCHED_INTEGRATORS, RUNNING, Ensemble
+from nbody.integrators import get_integrator
+
+STEPS = 200
+
+
+def members(name, factors):
+    base = load_scenario(name).initial_state()
+    return [base.replace(base.pos, base.vel * f) for f in factors]
+
+
+@pytest.mark.parametrize("integrator", BATCHED_INTEGRATORS)
+@pytest.mark.parametrize("name", ["binary", "3_body", "solar_system"])
+def test_ensemble_is_bit_identical_to_single_runs(name, integrator):
+    scenario = load_scenario(name)
+    states = members(name, [0.9, 1.0, 1.05])
+    # no collisions, the radii from the densities overlap at the scaled distances
+    ensemble = Ensemble(states, integrator=integrator, radius=0)
+    ensemble.run(scenario.dt, STEPS)
+    assert (ensemble.status == RUNNING).all()
+
+    update = make_update(direct_accelerations, get_integrator(integrator))
+    for i, state in enumerate(states):
+        for _ in range(STEPS):
+            state = update(state, scenario.dt)
+        member = ensemble.member(i)
+        assert np.array_equal(member.pos, state.pos)
+        assert np.array_equal(member.vel, state.vel)
+
+
+@pytest.mark.parametrize("integrator", ["kepler", "kepler_split"])
+def test_ensemble_rejects_unbatched_integrators(integrator):
+    with pytest.raises(ValueError, match="cannot integrate an ensemble"):
+        Ensemble(members("binary", [1.0]), integrator=integrator)
@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from nbody import G, SystemState, direct_accelerations, make_update
+from nbody.integrators import get_integrator
+from nbody.kepler import propagate
+
+MASS = 2e30  # Mass of the pinned central body.
+DISTANCE = 1.5e11
+DURATION = 1e7  # About a third of the elliptic orbit.
+STEPS = 50_000  # Leapfrog steps, the leapfrog error is then about 5e-10.
+TOLERANCE = 1e-9
+
+
+def orbit(speed_factor):
+    """A body on an inclined orbit around a pinned mass, `speed_factor` times
+    the circular speed, the orbit is hyperbolic above sqrt(2)."""
+    speed = speed_factor * (G * MASS / DISTANCE) ** 0.5
+    return SystemState(
+        pos=np.array([[0.0, 0.0, 0.0], [DISTANCE, 0.0, 0.0]]),
+        vel=np.array([[0.0, 0.0, 0.0], [0.0, speed, 0.1 * speed]]),
+        mass=np.array([MASS, 1.0]),
+        density=np.ones(2),
+        color=[(255, 255, 0), (0, 0, 255)],
+        fixed=np.array([True, False]),
+    )
+
+
+@pytest.mark.parametrize("speed_factor", [1.2, 1.6])
+def test_propagate_matches_fine_leapfrog(speed_factor):
+    state = orbit(speed_factor)
+    pos, vel = propagate(state.pos[1:], state.vel[1:], G * MASS, DURATION)
+
+    update = make_update(direct_accelerations, get_integrator("leapfrog"))
+    for _ in range(STEPS):
+        state = update(state, DURATION / STEPS)
+    assert np.abs(state.pos[1] - pos[0]).max() / np.abs(pos).max() < TOLERANCE
+    assert np.abs(state.vel[1] - vel[0]).max() / np.abs(vel).max() < TOLERANCE
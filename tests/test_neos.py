@@ -0,0 +1,22 @@
+import os
+import shutil
+
+import neos
+
+TESTS = os.path.dirname(os.path.abspath(__file__))
+DATA = os.path.join(TESTS, "data")
+SRC = os.path.join(os.path.dirname(TESTS), "src")
+
+
+def test_neos_prints_the_output_of_the_original_script(tmp_path, monkeypatch, capsys):
+    # neos_output.txt is the output of the original neos.py on neos.json
+    with open(os.path.join(DATA, "neos_output.txt")) as f:
+        expected = f.read()
+    shutil.copy(os.path.join(SRC, "neos.json"), tmp_path)
+    monkeypatch.chdir(tmp_path)
+
+    neos.main()  # parses the feed and writes the sidecar
+    assert capsys.readouterr().out == expected
+    assert os.path.exists(tmp_path / ("neos.json" + neos.CACHE_SUFFIX))
+    neos.main()  # loads the sidecar
+    assert capsys.readouterr().out == expected
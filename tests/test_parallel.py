@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+from nbody import SystemState, direct_accelerations, make_update
+from nbody.integrators import get_integrator
+from nbody.parallel import ParallelAccelerations
+
+
+def random_state(n, massless=0, seed=0):
+    rng = np.random.default_rng(seed)
+    mass = rng.uniform(1e20, 1e25, n)
+    mass[n - massless:] = 0.0
+    return SystemState(
+        pos=rng.normal(size=(n, 3)) * 1e11,
+        vel=rng.normal(size=(n, 3)) * 1e3,
+        mass=mass,
+        density=np.ones(n),
+        color=[(255, 255, 255)] * n,
+        fixed=np.zeros(n, dtype=bool),
+    )
+
+
+@pytest.mark.parametrize("workers", [1, 2, 3, 5])
+@pytest.mark.parametrize("massless", [0, 40])
+def test_parallel_is_bit_identical(workers, massless):
+    state = random_state(301, massless)
+    with ParallelAccelerations(workers=workers) as accelerations:
+        assert np.array_equal(
+            accelerations(state.pos, state.mass),
+            direct_accelerations(state.pos, state.mass),
+        )
+
+
+def test_parallel_steps_are_bit_identical():
+    serial = parallel = random_state(200)
+    leapfrog = get_integrator("leapfrog")
+    with ParallelAccelerations(workers=3) as accelerations:
+        serial_update = make_update(direct_accelerations, leapfrog)
+        parallel_update = make_update(accelerations, leapfrog)
+        for _ in range(5):
+            serial = serial_update(serial, 1000.0)
+            parallel = parallel_update(parallel, 1000.0)
+    assert np.array_equal(serial.pos, parallel.pos)
+    assert np.array_equal(serial.vel, parallel.vel)